@@ -0,0 +1,208 @@
+# benchmarks/run_benchmarks.py
+"""
+Reproducible, offline benchmark suite
+
+Generates seeded synthetic videos, times SportsPlayerTracker.process_video
+end to end for several configurations (with the model-free
+SyntheticBackend injected as the detector backend and pose disabled, so
+no weights, network or GPU are needed) and micro-benchmarks
+PlayerTracker.update at 1-200 detections per frame. Results are written as JSON; pass --compare with an earlier file to
+flag regressions.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --quick --compare benchmarks/results/<old>.json
+"""
+import sys
+import os
+import json
+import time
+import platform
+import argparse
+import subprocess
+import numpy as np
+from datetime import datetime
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(current_dir)
+sys.path.insert(0, repo_dir)
+sys.path.insert(0, os.path.join(repo_dir, 'src'))
+
+import cv2
+from src.main_pipeline import SportsPlayerTracker
+from detection.adaptive import InputSizePolicy
+from detection.player_detector import PlayerDetector
+from detection.roi import PlayArea
+from tracking.appearance import AppearanceReID
+from tracking.player_tracker import PlayerTracker
+from synthetic_backend import SyntheticBackend
+from synthetic_video import generate_video, synthetic_detections
+
+# name -> (SportsPlayerTracker kwargs, process_video kwargs); the streaming
+# engine runs when 'streaming_workers' is given
+CONFIGURATIONS = {
+    'baseline': ({}, {}),
+    'analytics_only': ({}, {'render': False}),
+    'batch_4': ({}, {'batch_size': 4}),
+    'stride_3_flow': ({}, {'detect_stride': 3}),
+    'stride_3_kalman': ({}, {'detect_stride': 3, 'propagation': 'kalman'}),
+    'threaded_io': ({}, {'threaded_io': True}),
+    'play_area': ({'play_area': lambda: PlayArea(warmup_frames=15)}, {}),
+    'adaptive_imgsz': ({'input_size': lambda: InputSizePolicy(segment_frames=30)}, {}),
+    'appearance_reid': ({'reid': AppearanceReID}, {}),
+    'streaming_2_workers': ({}, {'streaming_workers': 2}),
+}
+
+DETECTION_COUNTS = (1, 5, 10, 25, 50, 100, 200)
+
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_dir,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def bench_end_to_end(video_path, frames, output_dir, configurations, repeats=1):
+    """Time process_video per configuration; the best of `repeats` runs is kept"""
+    results = {}
+    for name in configurations:
+        tracker_kwargs, video_kwargs = CONFIGURATIONS[name]
+        runs = []
+        for _ in range(repeats):
+            tracker = SportsPlayerTracker(pose_mode='none', backend=SyntheticBackend, **{
+                key: factory() for key, factory in tracker_kwargs.items()
+            })
+            kwargs = dict(video_kwargs)
+            workers = kwargs.pop('streaming_workers', None)
+            output_path = os.path.join(output_dir, f"{name}.avi")
+            
+            start_time = time.perf_counter()
+            if workers:
+                tracker.process_video_streaming(video_path, output_path, max_frames=frames,
+                                                num_workers=workers)
+            else:
+                tracker.process_video(video_path, output_path, max_frames=frames, **kwargs)
+            wall_time = time.perf_counter() - start_time
+            
+            metrics = tracker.calculate_performance_metrics()
+            runs.append({
+                'wall_time': wall_time,
+                'fps': metrics['total_frames'] / wall_time if wall_time > 0 else 0.0,
+                'frames': metrics['total_frames'],
+                'model_calls_per_frame': metrics['average_model_calls_per_frame'],
+                'unique_tracks': tracker.results_summary()['total_tracks'],
+                'stage_p95_ms': {stage: values['p95']
+                                 for stage, values in metrics['profile']['stages'].items()}
+            })
+        results[name] = max(runs, key=lambda run: run['fps'])
+        print(f"  {name:<22} {results[name]['fps']:8.1f} FPS")
+    return results
+
+def bench_tracker_update(detection_counts=DETECTION_COUNTS, frames=300, warmup=30):
+    """Per-call PlayerTracker.update latency (microseconds) by detections per frame"""
+    results = {}
+    for count in detection_counts:
+        tracker = PlayerTracker()
+        # Detection dicts are built up front so only update() is timed
+        per_frame = [PlayerDetector.to_detections(boxes, confidences)
+                     for boxes, confidences in synthetic_detections(count, warmup + frames, seed=count)]
+        for detections in per_frame[:warmup]:
+            tracker.update(detections)
+        
+        timings = np.empty(frames)
+        for i, detections in enumerate(per_frame[warmup:]):
+            start = time.perf_counter_ns()
+            tracker.update(detections)
+            timings[i] = (time.perf_counter_ns() - start) / 1e3
+        
+        p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+        results[str(count)] = {'mean_us': float(timings.mean()), 'p50_us': float(p50),
+                               'p95_us': float(p95), 'p99_us': float(p99),
+                               'live_tracks': len(tracker.tracks)}
+        print(f"  {count:>4} detections  p50 {p50:8.1f} us  p95 {p95:8.1f} us")
+    return results
+
+def compare(current, baseline, tolerance):
+    """Regressions beyond `tolerance` (relative) versus a previous results file"""
+    regressions = []
+    for name, run in current.get('end_to_end', {}).items():
+        old = baseline.get('end_to_end', {}).get(name)
+        if old and old['fps'] > 0 and run['fps'] < old['fps'] * (1 - tolerance):
+            regressions.append(f"end_to_end.{name}: {old['fps']:.1f} -> {run['fps']:.1f} FPS")
+    for count, run in current.get('tracker_update', {}).items():
+        old = baseline.get('tracker_update', {}).get(count)
+        if old and run['p50_us'] > old['p50_us'] * (1 + tolerance):
+            regressions.append(f"tracker_update.{count}: p50 {old['p50_us']:.1f} -> {run['p50_us']:.1f} us")
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument('--quick', action='store_true',
+                        help="Shorter videos and fewer tracker frames (CI smoke run)")
+    parser.add_argument('--frames', type=int, default=None,
+                        help="Frames per end-to-end run (default 300, 60 with --quick)")
+    parser.add_argument('--configs', nargs='+', choices=sorted(CONFIGURATIONS),
+                        default=list(CONFIGURATIONS), help="End-to-end configurations to run")
+    parser.add_argument('--repeats', type=int, default=1,
+                        help="End-to-end runs per configuration (best is kept)")
+    parser.add_argument('--skip-end-to-end', action='store_true')
+    parser.add_argument('--skip-tracker', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', default=os.path.join(current_dir, 'work'),
+                        help="Where synthetic and output videos are written")
+    parser.add_argument('--output', default=None,
+                        help="Results JSON (default benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument('--compare', metavar='JSON',
+                        help="Earlier results file; exit non-zero on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Relative slowdown tolerated by --compare")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    frames = args.frames or (60 if args.quick else 300)
+    results = {'environment': _environment(), 'seed': args.seed, 'frames': frames}
+    
+    if not args.skip_end_to_end:
+        video_path = os.path.join(args.work_dir, f"synthetic_{frames}_{args.seed}.avi")
+        if not os.path.exists(video_path):
+            print(f"Generating synthetic video ({frames} frames)...")
+            generate_video(video_path, num_frames=frames, seed=args.seed)
+        print("End-to-end throughput:")
+        results['end_to_end'] = bench_end_to_end(video_path, frames, os.path.join(args.work_dir, 'out'),
+                                                 args.configs, args.repeats)
+    
+    if not args.skip_tracker:
+        print("PlayerTracker.update latency:")
+        results['tracker_update'] = bench_tracker_update(frames=100 if args.quick else 300)
+    
+    output = args.output
+    if output is None:
+        commit = results['environment']['commit'] or 'nocommit'
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(current_dir, 'results', f"{stamp}_{commit}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✓ Results written to {output}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"✓ No regressions beyond {args.tolerance:.0%}")
+
+if __name__ == "__main__":
+    main()
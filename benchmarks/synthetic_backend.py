@@ -0,0 +1,43 @@
+# benchmarks/synthetic_backend.py
+import cv2
+import numpy as np
+from typing import List
+from detection.backends import Prediction
+
+class SyntheticBackend:
+    """
+    Model-free detector for the synthetic benchmark videos
+    
+    Finds the saturated player rectangles drawn by synthetic_video.py
+    (saturation threshold + connected components) so end-to-end benchmarks
+    run without weights, network or GPU. The image is downscaled to imgsz
+    like a letterboxing model would, so input-size settings still matter.
+    """
+    
+    def __init__(self, imgsz: int = None, min_saturation: int = 120, min_area: int = 12):
+        self.class_names = {0: 'person'}
+        self.imgsz = imgsz
+        self.min_saturation = min_saturation
+        self.min_area = min_area
+    
+    def predict(self, images: List[np.ndarray], conf: float, classes: List[int] = None,
+                imgsz: int = None) -> List[Prediction]:
+        return [self._detect(image, conf, imgsz or self.imgsz) for image in images]
+    
+    def _detect(self, image, conf, imgsz) -> Prediction:
+        scale = 1.0
+        if imgsz and max(image.shape[:2]) > imgsz:
+            scale = imgsz / max(image.shape[:2])
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        saturation = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)[..., 1]
+        mask = (saturation >= self.min_saturation).astype(np.uint8)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        stats = stats[1:]  # label 0 is the background
+        x, y, w, h, area = stats.T
+        # Fill ratio stands in for confidence (solid rectangles score ~1)
+        confidences = (area / np.maximum(w * h, 1)).astype(np.float32)
+        keep = (area * (1 / scale) ** 2 >= self.min_area) & (confidences > conf)
+        
+        boxes = np.stack([x, y, x + w, y + h], axis=1)[keep].astype(np.float32) / scale
+        return boxes, confidences[keep], np.zeros(int(keep.sum()), dtype=np.int64)
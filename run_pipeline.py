@@ -2,51 +2,89 @@
 import sys
 import os
 import json
-import matplotlib.pyplot as plt
-import seaborn as sns
+import time
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 from datetime import datetime
 
 # Add the current directory to Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
+# src modules import each other as top-level packages (detection, tracking, ...)
+sys.path.insert(0, os.path.join(current_dir, 'src'))
 
-# Now import from src
+# Now import from src (models and their libraries load lazily on first use)
+_import_start = time.perf_counter()
 from src.main_pipeline import SportsPlayerTracker
+from utils.inference_cache import InferenceCache
+from utils.render import render_results
+from utils.stats import ResultsAccumulator
+PIPELINE_IMPORT_TIME = time.perf_counter() - _import_start
 
-def generate_report(results, performance_metrics, video_name):
-    """Generate comprehensive report"""
-    if not results:
+def _summarize(results):
+    """Report aggregates for in-memory frame_results or a ResultsReader"""
+    if hasattr(results, 'summary'):
+        return results.summary()
+    
+    accumulator = ResultsAccumulator()
+    for frame in results:
+        accumulator.update(frame['detections'], frame['tracks'], frame.get('keyframe', True))
+    return accumulator.summary()
+
+def generate_report(results, performance_metrics, video_name, summary=None):
+    """
+    Generate comprehensive report
+    
+    `summary` is the per-frame accumulated summary from
+    SportsPlayerTracker.results_summary(); without it the results are rescanned.
+    """
+    if summary is None:
+        if not results:
+            print(f"No results for {video_name}")
+            return ""
+        summary = _summarize(results)
+    
+    # Calculate basic metrics
+    frame_count = summary['frame_count']
+    if frame_count == 0:
         print(f"No results for {video_name}")
         return ""
-        
-    # Calculate basic metrics
-    total_detections = sum(len(frame['detections']) for frame in results)
-    total_tracks = len(set(track['track_id'] for frame in results for track in frame['tracks']))
+    keyframe_count = summary['keyframe_count']
+    total_detections = summary['total_detections']
+    detections_per_keyframe = total_detections / keyframe_count if keyframe_count else 0
+    total_tracks = summary['total_tracks']
+    avg_confidence = summary['average_confidence']
+    stage_lines = "\n".join(
+        f"| {name} | {stage['count']} | {stage['p50']:.2f} | {stage['p95']:.2f} | {stage['p99']:.2f} |"
+        for name, stage in performance_metrics.get('profile', {}).get('stages', {}).items()
+    )
+    peak_rss = performance_metrics.get('profile', {}).get('memory', {}).get('peak_rss')
+    cache = performance_metrics.get('inference_cache') or {}
     
-    # Calculate average confidence
-    all_confidences = [d['confidence'] for frame in results for d in frame['detections']]
-    avg_confidence = np.mean(all_confidences) if all_confidences else 0
+    # Deferred: matplotlib costs noticeable startup time and is only needed here
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
     
     # Create metrics plot
     plt.figure(figsize=(12, 4))
     
+    # Only keyframes have detections of their own
+    keyframes = np.asarray(summary['keyframes'], dtype=bool)
+    keyframe_numbers = np.flatnonzero(keyframes) + 1
+    
     plt.subplot(1, 2, 1)
-    confidences = []
-    for frame in results:
-        if frame['detections']:
-            confidences.append(np.mean([d['confidence'] for d in frame['detections']]))
-        else:
-            confidences.append(0)
-    plt.plot(confidences)
+    plt.plot(keyframe_numbers, np.asarray(summary['frame_confidences'])[keyframes])
     plt.title('Detection Confidence Over Time')
     plt.xlabel('Frame Number')
     plt.ylabel('Average Confidence')
     
     plt.subplot(1, 2, 2)
-    detections_per_frame = [len(frame['detections']) for frame in results]
-    plt.plot(detections_per_frame)
-    plt.title('Number of Detections Per Frame')
+    plt.plot(keyframe_numbers, np.asarray(summary['detections_per_frame'])[keyframes])
+    plt.title('Number of Detections Per Keyframe')
     plt.xlabel('Frame Number')
     plt.ylabel('Number of Detections')
     
@@ -59,9 +97,10 @@ def generate_report(results, performance_metrics, video_name):
 # SC549 Player Tracking Report - {video_name}
 
 ## Performance Summary
-- **Total Frames Processed:** {len(results)}
-- **Total Detections:** {total_detections}
-- **Average Detections per Frame:** {total_detections/len(results):.2f}
+- **Total Frames Processed:** {frame_count}
+- **Detector Keyframes:** {keyframe_count}
+- **Total Detections:** {total_detections} (keyframes only)
+- **Average Detections per Keyframe:** {detections_per_keyframe:.2f}
 - **Total Unique Tracks:** {total_tracks}
 - **Average Detection Confidence:** {avg_confidence:.3f}
 
@@ -69,12 +108,19 @@ def generate_report(results, performance_metrics, video_name):
 - **Average Detection Time:** {performance_metrics['average_detection_time']*1000:.2f} ms
 - **Average Pose Time:** {performance_metrics['average_pose_time']*1000:.2f} ms  
 - **Average Tracking Time:** {performance_metrics['average_tracking_time']*1000:.2f} ms
-- **Processing FPS:** {performance_metrics['fps']:.2f}
+- **Processing FPS:** {performance_metrics['fps']:.2f} (decode through encode)
+- **Peak Memory (RSS):** {f"{peak_rss:.0f} MB" if peak_rss else "n/a"}
+- **Inference Cache Hit Rate:** {f"{cache['hit_rate']:.1%} ({cache['hits']} hits, {cache['misses']} misses)" if cache else "n/a"}
+
+## Stage Latency (ms)
+| Stage | Spans | p50 | p95 | p99 |
+|-------|-------|-----|-----|-----|
+{stage_lines}
 
 ## Model Architecture
 - **Player Detection:** YOLOv8
 - **Pose Estimation:** Simplified Pose Estimation
-- **Tracking:** Simple ID Assignment
+- **Tracking:** IoU + Hungarian Assignment (SORT-style)
 
 ## Sample Output
 ![Metrics]({video_name}_metrics.png)
@@ -91,27 +137,169 @@ def generate_report(results, performance_metrics, video_name):
         json.dump({
             'detection_metrics': {
                 'total_detections': total_detections,
-                'average_confidence': avg_confidence,
-                'detections_per_frame': total_detections/len(results)
+                'average_confidence': float(avg_confidence),
+                'keyframe_count': keyframe_count,
+                'detections_per_keyframe': detections_per_keyframe,
+                'confidence_std': summary.get('confidence_std'),
+                'confidence_histogram': summary.get('confidence_histogram')
             },
             'tracking_metrics': {
                 'total_tracks': total_tracks
             },
             'performance_metrics': performance_metrics,
-            'frame_count': len(results)
+            'frame_count': frame_count
         }, f, indent=2)
     
     return report
 
+# Per-process tracker for parallel mode, created once by _init_worker
+_worker_tracker = None
+
+def _inference_cache(args):
+    if not args.cache_dir:
+        return None
+    return InferenceCache(args.cache_dir, max_bytes=int(args.cache_max_gb * 1024 ** 3))
+
+def _init_worker(torch_threads, backend='torch', inference_cache=None):
+    """Process-pool initializer: cap intra-op threads, then load YOLO and MediaPipe once"""
+    global _worker_tracker
+    if torch_threads:
+        import cv2
+        import torch
+        torch.set_num_threads(torch_threads)
+        cv2.setNumThreads(torch_threads)
+    _worker_tracker = SportsPlayerTracker(backend=backend, inference_cache=inference_cache)
+
+def _results_dir(video_path, stream_results):
+    if not stream_results:
+        return None
+    return f"outputs/{os.path.basename(video_path).replace('.mp4', '')}_frames"
+
+def _trace_path(video_path, trace):
+    if not trace:
+        return None
+    return f"outputs/{os.path.basename(video_path).replace('.mp4', '')}_trace.json"
+
+def _output_path(video_path, analytics_only=False):
+    # No annotated video in analytics-only mode
+    return None if analytics_only else f"outputs/tracked_{os.path.basename(video_path)}"
+
+def _process_video_job(video_path, max_frames, stream_results=False, analytics_only=False, trace=False):
+    """Process one video in a worker; metrics are reset per video by process_video"""
+    output_path = _output_path(video_path, analytics_only)
+    results = _worker_tracker.process_video(video_path, output_path, max_frames=max_frames,
+                                            results_dir=_results_dir(video_path, stream_results),
+                                            trace_path=_trace_path(video_path, trace))
+    performance_metrics = _worker_tracker.calculate_performance_metrics() if results else None
+    return video_path, results, performance_metrics, _worker_tracker.results_summary()
+
+def _finish_video(video_path, results, performance_metrics, summary=None):
+    if results:
+        # Generate report
+        video_name = os.path.basename(video_path).replace('.mp4', '')
+        generate_report(results, performance_metrics, video_name, summary)
+        
+        print(f"COMPLETED: {os.path.basename(video_path)}")
+        print(f"Performance: {performance_metrics['fps']:.2f} FPS")
+    else:
+        print(f"No results for {os.path.basename(video_path)}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sports Player Tracking Pipeline")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Videos processed in parallel (1 = serial in this process)")
+    parser.add_argument('--torch-threads', type=int, default=None,
+                        help="Torch/OpenCV threads per worker process (avoids oversubscription)")
+    parser.add_argument('--max-frames', type=int, default=None,
+                        help="Maximum frames processed per video (default 30; unlimited with --live)")
+    parser.add_argument('--backend', default='torch',
+                        choices=['torch', 'onnx', 'onnx-int8', 'openvino'],
+                        help="Detector inference backend")
+    parser.add_argument('--serve', metavar='SOCKET',
+                        help="Run a warm worker daemon on this Unix socket")
+    parser.add_argument('--submit', metavar='SOCKET',
+                        help="Send the videos to a worker daemon instead of loading models here")
+    parser.add_argument('--analytics-only', action='store_true',
+                        help="Skip drawing and video writing; produce results and reports only")
+    parser.add_argument('--render-offline', action='store_true',
+                        help="Process analytics-only, then render the annotated video from the "
+                             "stored results (serial and --workers modes)")
+    parser.add_argument('--trace', action='store_true',
+                        help="Export per-stage profiler spans as outputs/<video>_trace.json (Chrome trace)")
+    parser.add_argument('--chunk-frames', type=int, default=None,
+                        help="Process each video in resumable chunks of N frames "
+                             "(checkpoints in outputs/<video>_chunks; rerun to resume)")
+    parser.add_argument('--chunk-workers', type=int, default=1,
+                        help="Chunks processed in parallel with --chunk-frames")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Cache detector and pose outputs here; re-runs on the same videos "
+                             "and models skip inference")
+    parser.add_argument('--cache-max-gb', type=float, default=2.0,
+                        help="Inference cache size bound (least recently used videos evicted)")
+    parser.add_argument('--live', metavar='SOURCE',
+                        help="Process a camera index, RTSP URL, pipe or file in real time and "
+                             "write track JSON lines to stdout (files replay at native fps)")
+    parser.add_argument('--latency-budget', type=float, default=100.0,
+                        help="Per-frame latency budget in ms for --live")
+    parser.add_argument('--stream-results', action='store_true',
+                        help="Write per-frame results to columnar chunks on disk instead of memory")
+    args = parser.parse_args()
+    if args.chunk_frames and (args.workers > 1 or args.submit):
+        parser.error("--chunk-frames processes videos one at a time in this process; "
+                     "parallelise with --chunk-workers instead of --workers/--submit")
+    if args.max_frames is None and not args.live:
+        args.max_frames = 30
+    return args
+
+def _print_startup(startup):
+    print(f"Startup: pipeline import {PIPELINE_IMPORT_TIME:.2f}s, "
+          f"library import {startup['import_time']:.2f}s, "
+          f"model load {startup['model_load_time']:.2f}s, "
+          f"first inference {startup['warmup_time'] or 0:.2f}s")
+
+def _submit_videos(socket_path, videos, args):
+    from src.service.worker_daemon import submit_job
+    for video_path in videos:
+        reply = submit_job(socket_path, {
+            'video_path': video_path,
+            'output_path': _output_path(video_path, args.analytics_only or args.render_offline),
+            'max_frames': args.max_frames,
+            'results_dir': _results_dir(video_path, args.stream_results),
+            'trace_path': _trace_path(video_path, args.trace)
+        })
+        if reply.get('status') != 'ok':
+            print(f"Worker failed on {os.path.basename(video_path)}: {reply.get('error')}")
+            continue
+        # The reply carries the accumulated summary, so the frame count stands in for results
+        _finish_video(video_path, reply['frame_count'], reply['performance_metrics'], reply['summary'])
+
+def _run_live(args):
+    # stdout carries the JSON lines; everything else is logged to stderr
+    output = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        tracker = SportsPlayerTracker(backend=args.backend)
+        stats = tracker.process_live(args.live, budget_ms=args.latency_budget,
+                                     max_frames=args.max_frames, output=output)
+        tracker.close()
+        if stats:
+            print(f"Live summary: {json.dumps({k: v for k, v in stats.items() if k != 'latency_ms'})}")
+
 def main():
+    args = parse_args()
+    if args.live:
+        _run_live(args)
+        return
     print("Starting Sports Player Tracking Pipeline...")
     
+    if args.serve:
+        from src.service.worker_daemon import WorkerDaemon
+        WorkerDaemon(SportsPlayerTracker(backend=args.backend, inference_cache=_inference_cache(args)),
+                     args.serve).serve_forever()
+        return
+    
     # Create outputs directory
     os.makedirs('outputs', exist_ok=True)
     
-    # Initialize tracker
-    tracker = SportsPlayerTracker()
-    
     # VIDEO FILES CONFIGURATION - MODIFY THIS FOR YOUR VIDEOS
     video_files = [
         "data/videos/Badminton_1.mp4",
@@ -137,32 +325,57 @@ def main():
     
     print(f"Found {len(existing_videos)} video(s) to process")
     
-    all_results = {}
-    
-    for video_path in existing_videos:
-        print(f"\n{'='*50}")
-        print(f"PROCESSING: {os.path.basename(video_path)}")
-        print(f"{'='*50}")
-        
-        # Output path for processed video
-        output_path = f"outputs/tracked_{os.path.basename(video_path)}"
+    if args.submit:
+        _submit_videos(args.submit, existing_videos, args)
+    elif args.workers > 1:
+        workers = min(args.workers, len(existing_videos))
+        print(f"Processing in parallel with {workers} worker process(es)")
         
-        # Process video (30 frames for testing)
-        results = tracker.process_video(video_path, output_path, max_frames=30)
-        all_results[video_path] = results
+        # spawn: torch thread pools do not survive fork reliably
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(args.torch_threads, args.backend,
+                                           _inference_cache(args))) as pool:
+            futures = [pool.submit(_process_video_job, video_path, args.max_frames,
+                                   args.stream_results, args.analytics_only or args.render_offline,
+                                   args.trace)
+                       for video_path in existing_videos]
+            for future in as_completed(futures):
+                video_path, results, performance_metrics, summary = future.result()
+                _finish_video(video_path, results, performance_metrics, summary)
+                if results and args.render_offline:
+                    render_results(video_path, results, _output_path(video_path))
+    else:
+        # Initialize tracker
+        tracker = SportsPlayerTracker(backend=args.backend, inference_cache=_inference_cache(args))
         
-        if results:
-            # Calculate performance metrics
-            performance_metrics = tracker.calculate_performance_metrics()
+        for video_path in existing_videos:
+            print(f"\n{'='*50}")
+            print(f"PROCESSING: {os.path.basename(video_path)}")
+            print(f"{'='*50}")
             
-            # Generate report
-            video_name = os.path.basename(video_path).replace('.mp4', '')
-            report = generate_report(results, performance_metrics, video_name)
+            # Output path for processed video
+            output_path = _output_path(video_path, args.analytics_only or args.render_offline)
             
-            print(f"COMPLETED: {os.path.basename(video_path)}")
-            print(f"Performance: {performance_metrics['fps']:.2f} FPS")
-        else:
-            print(f"No results for {os.path.basename(video_path)}")
+            if args.chunk_frames:
+                work_dir = f"outputs/{os.path.basename(video_path).replace('.mp4', '')}_chunks"
+                results = tracker.process_video_chunked(video_path, work_dir, max_frames=args.max_frames,
+                                                        chunk_frames=args.chunk_frames,
+                                                        workers=args.chunk_workers)
+                _finish_video(video_path, results, tracker.chunk_metrics)
+            else:
+                results = tracker.process_video(video_path, output_path, max_frames=args.max_frames,
+                                                results_dir=_results_dir(video_path, args.stream_results),
+                                                trace_path=_trace_path(video_path, args.trace))
+                performance_metrics = tracker.calculate_performance_metrics() if results else None
+                _finish_video(video_path, results, performance_metrics, tracker.results_summary())
+            
+            if results and args.render_offline:
+                render_results(video_path, results, _output_path(video_path))
+        
+        _print_startup(tracker.startup_timings)
+        tracker.close()
     
     print(f"\n PIPELINE COMPLETED!")
     print(f"   Processed {len(existing_videos)} video(s)")
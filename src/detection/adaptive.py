@@ -0,0 +1,180 @@
+import cv2
+import numpy as np
+import threading
+from typing import List, Dict, Tuple, Callable
+from utils.picklable_lock import PicklableLock
+from utils.stats import RunningStats
+
+class InputSizePolicy(PicklableLock):
+    def __init__(self, sizes=(320, 480, 640, 960, 1280), initial_size=640, target_height=32,
+                 percentile=10, segment_frames=60):
+        """
+        Picks the detector input size per segment from observed player sizes
+        
+        After each segment the small-player box height (the `percentile`-th
+        height, relative to the inference image) is measured and the smallest
+        size in `sizes` that still renders it at least `target_height` model
+        pixels tall is used for the next segment.
+        
+        Args:
+            sizes: Candidate YOLO input sizes (multiples of 32), ascending
+            initial_size: Size used until the first segment has been observed
+            target_height: Minimum player height in model input pixels
+            percentile: Box-height percentile treated as "small player"
+            segment_frames: Frames between size decisions
+        """
+        self.sizes = sorted(sizes)
+        self.initial_size = initial_size
+        self.target_height = target_height
+        self.percentile = percentile
+        self.segment_frames = segment_frames
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Start a new video at the initial size"""
+        self.imgsz = self.initial_size
+        self._heights = []
+        self._frames = 0
+        self._total_frames = 0
+        self.history = [(0, self.imgsz)]
+        self.latency = {}
+    
+    def observe(self, boxes: np.ndarray, image_shape: Tuple[int, ...]):
+        """Record one frame's detections (in inference-image pixels)"""
+        with self._lock:
+            if len(boxes):
+                self._heights.append((boxes[:, 3] - boxes[:, 1]) / max(image_shape[:2]))
+            self._frames += 1
+            self._total_frames += 1
+            if self._frames >= self.segment_frames:
+                self._choose()
+    
+    def record_latency(self, imgsz: int, seconds: float):
+        with self._lock:
+            self.latency.setdefault(imgsz, RunningStats()).update(seconds)
+    
+    def _choose(self):
+        if self._heights:
+            heights = np.concatenate(self._heights)
+            small = max(float(np.percentile(heights, self.percentile)), 1e-6)
+            # A box of relative height h is h * imgsz model pixels after letterboxing
+            needed = self.target_height / small
+            imgsz = next((size for size in self.sizes if size >= needed), self.sizes[-1])
+            if imgsz != self.imgsz:
+                self.imgsz = imgsz
+                self.history.append((self._total_frames, imgsz))
+        # No detections in the segment: keep the current size
+        self._heights = []
+        self._frames = 0
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'current_imgsz': self.imgsz,
+                'imgsz_changes': [{'frame': frame, 'imgsz': imgsz} for frame, imgsz in self.history],
+                'latency_by_imgsz': {size: {'calls': stats.count, 'average_time': stats.mean}
+                                     for size, stats in sorted(self.latency.items())}
+            }
+
+class TiledRefinement(PicklableLock):
+    def __init__(self, low_imgsz=320, tile_size=640, overlap=0.2, small_height=0.08,
+                 iou_threshold=0.5):
+        """
+        Cheap low-res pass plus high-res tiles only where small players are
+        
+        Each frame is detected once at `low_imgsz`; grid tiles that contain a
+        small detection from this pass, or from the previous frame's merged
+        result (small players the low-res pass missed), are re-detected at
+        their native resolution and merged with NMS.
+        
+        Args:
+            low_imgsz: Input size of the full-frame pass (unless an
+                InputSizePolicy chooses it)
+            tile_size: Tile edge in frame pixels; tiles run at imgsz=tile_size
+            overlap: Relative overlap between neighbouring tiles
+            small_height: Box height, relative to the frame height, below
+                which a player is considered small
+            iou_threshold: NMS overlap used when merging tile detections
+        """
+        self.low_imgsz = low_imgsz
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.small_height = small_height
+        self.iou_threshold = iou_threshold
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Forget the small players expected from the previous frame"""
+        self._expected = np.empty((0, 4), dtype=np.float32)
+        self.frames = 0
+        self.tiles_run = 0
+    
+    def tiles(self, image_shape) -> np.ndarray:
+        """Overlapping (x1, y1, x2, y2) grid covering the image"""
+        h, w = image_shape[:2]
+        return np.array([(x, y, min(x + self.tile_size, w), min(y + self.tile_size, h))
+                         for y in self._starts(h) for x in self._starts(w)], dtype=np.float32)
+    
+    def _starts(self, length):
+        if length <= self.tile_size:
+            return [0]
+        step = int(self.tile_size * (1 - self.overlap))
+        starts = list(range(0, length - self.tile_size, step))
+        return starts + [length - self.tile_size]
+    
+    def _small(self, boxes, image_shape):
+        return boxes[(boxes[:, 3] - boxes[:, 1]) < self.small_height * image_shape[0]]
+    
+    def select(self, image_shape, boxes: np.ndarray) -> np.ndarray:
+        """Tiles whose area contains the centre of a small (or expected small) player"""
+        with self._lock:
+            small = np.concatenate([self._small(boxes, image_shape), self._expected])
+        tiles = self.tiles(image_shape)
+        if len(small) == 0:
+            return tiles[:0]
+        cx = (small[:, 0] + small[:, 2]) / 2
+        cy = (small[:, 1] + small[:, 3]) / 2
+        inside = ((cx[None] >= tiles[:, 0:1]) & (cx[None] < tiles[:, 2:3]) &
+                  (cy[None] >= tiles[:, 1:2]) & (cy[None] < tiles[:, 3:4]))
+        return tiles[inside.any(axis=1)]
+    
+    def refine(self, image: np.ndarray, boxes: np.ndarray, confidences: np.ndarray,
+               detect: Callable[[List[np.ndarray], int], List[Tuple[np.ndarray, np.ndarray]]]):
+        """
+        Add high-res tile detections to a low-res result
+        
+        `detect(images, imgsz)` returns (boxes, confidences) per image.
+        """
+        tiles = self.select(image.shape, boxes)
+        if len(tiles):
+            crops = [image[int(y1):int(y2), int(x1):int(x2)] for x1, y1, x2, y2 in tiles]
+            results = detect(crops, self.tile_size)
+            boxes = np.concatenate([boxes] + [tile_boxes + np.tile(tile[:2], 2)
+                                              for (tile_boxes, _), tile in zip(results, tiles)])
+            confidences = np.concatenate([confidences] + [conf for _, conf in results])
+            boxes, confidences = self._merge(boxes, confidences)
+        
+        with self._lock:
+            self._expected = self._small(boxes, image.shape)
+            self.frames += 1
+            self.tiles_run += len(tiles)
+        return boxes, confidences
+    
+    def _merge(self, boxes, confidences):
+        if len(boxes) == 0:
+            return boxes, confidences
+        xywh = np.column_stack([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]])
+        keep = cv2.dnn.NMSBoxes(xywh.tolist(), confidences.tolist(), 0.0, self.iou_threshold)
+        keep = np.asarray(keep, dtype=np.int64).reshape(-1)
+        return boxes[keep].astype(np.float32), confidences[keep].astype(np.float32)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'low_imgsz': self.low_imgsz,
+                'tile_imgsz': self.tile_size,
+                'tiles_run': self.tiles_run,
+                'average_tiles_per_frame': self.tiles_run / self.frames if self.frames else 0
+            }
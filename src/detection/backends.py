@@ -0,0 +1,197 @@
+import ast
+import hashlib
+import os
+import shutil
+import cv2
+import numpy as np
+from typing import List, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'player-tracking', 'models')
+
+# (xyxy boxes (N, 4), confidences (N,), class ids (N,)) for one image
+Prediction = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+def _empty_prediction() -> Prediction:
+    return (np.empty((0, 4), dtype=np.float32), np.empty((0,), dtype=np.float32),
+            np.empty((0,), dtype=np.int64))
+
+class TorchBackend:
+    """Ultralytics YOLO on PyTorch"""
+    
+    def __init__(self, model_name: str, imgsz: int = None):
+        from ultralytics import YOLO
+        self.model = YOLO(model_name)
+        self.class_names = self.model.names
+        self.imgsz = imgsz
+    
+    def predict(self, images: List[np.ndarray], conf: float, classes: List[int] = None,
+                imgsz: int = None) -> List[Prediction]:
+        kwargs = {}
+        if imgsz or self.imgsz:
+            kwargs['imgsz'] = imgsz or self.imgsz
+        results = self.model(images, conf=conf, classes=classes, verbose=False, **kwargs)
+        
+        predictions = []
+        for result in results:
+            boxes = result.boxes
+            if boxes is None or len(boxes) == 0:
+                predictions.append(_empty_prediction())
+                continue
+            predictions.append((boxes.xyxy.cpu().numpy().astype(np.float32),
+                                boxes.conf.cpu().numpy().astype(np.float32),
+                                boxes.cls.cpu().numpy().astype(np.int64)))
+        return predictions
+
+def _resolve_weights(model_name: str) -> str:
+    """
+    Local weights file for `model_name`; hub names (e.g. 'yolov8n.pt') that
+    are not on disk yet are downloaded by Ultralytics, so the first run and
+    later ones resolve to the same file
+    """
+    if os.path.isfile(model_name):
+        return model_name
+    from ultralytics import YOLO
+    return str(YOLO(model_name).ckpt_path or model_name)
+
+def _weights_tag(weights_path: str) -> str:
+    """
+    Short fingerprint of a weights file (path, size, mtime), so a retrained
+    or different file with the same name gets its own export
+    """
+    if not os.path.isfile(weights_path):
+        return ""
+    info = os.stat(weights_path)
+    key = f"{os.path.abspath(weights_path)}:{info.st_size}:{info.st_mtime_ns}"
+    return "_" + hashlib.sha1(key.encode()).hexdigest()[:10]
+
+def export_onnx(model_name: str, imgsz: int = 640, int8: bool = False, cache_dir: str = None) -> str:
+    """
+    Export YOLO weights to ONNX once and return the cached file path
+    
+    Exports are cached as <cache_dir>/<model>_<weights tag>_<imgsz>[_int8].onnx,
+    so repeat runs with the same weights file and input size skip the export
+    entirely.
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    weights_path = _resolve_weights(model_name)
+    stem = os.path.splitext(os.path.basename(model_name))[0] + _weights_tag(weights_path)
+    fp32_path = os.path.join(cache_dir, f"{stem}_{imgsz}.onnx")
+    int8_path = os.path.join(cache_dir, f"{stem}_{imgsz}_int8.onnx")
+    
+    if not os.path.exists(fp32_path):
+        from ultralytics import YOLO
+        print(f"Exporting {model_name} to ONNX (imgsz={imgsz})...")
+        exported = YOLO(weights_path).export(format='onnx', imgsz=imgsz, dynamic=True)
+        shutil.move(str(exported), fp32_path)
+    
+    if not int8:
+        return fp32_path
+    
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        print("Quantizing ONNX model to INT8...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+def letterbox(image: np.ndarray, size: int, color=(114, 114, 114)):
+    """Resize keeping aspect ratio and pad to size x size; returns (image, scale, (pad_x, pad_y))"""
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    padded = np.full((size, size, 3), color, dtype=np.uint8)
+    padded[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+    return padded, scale, (pad_x, pad_y)
+
+class OnnxBackend:
+    """YOLO exported to ONNX and run with onnxruntime (optionally via OpenVINO)"""
+    
+    def __init__(self, model_name: str, imgsz: int = 640, int8: bool = False,
+                 cache_dir: str = None, openvino: bool = False, iou_threshold: float = 0.7):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The ONNX backend needs onnxruntime: pip install onnxruntime")
+        
+        self.imgsz = imgsz
+        self.iou_threshold = iou_threshold
+        self.model_path = export_onnx(model_name, imgsz, int8, cache_dir)
+        
+        providers = ['CPUExecutionProvider']
+        if openvino:
+            if 'OpenVINOExecutionProvider' in ort.get_available_providers():
+                providers.insert(0, 'OpenVINOExecutionProvider')
+            else:
+                print("⚠ OpenVINOExecutionProvider not available, using CPU provider "
+                      "(pip install onnxruntime-openvino)")
+        
+        self.session = ort.InferenceSession(self.model_path, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        # Ultralytics stores the class names in the ONNX metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.class_names = ast.literal_eval(metadata['names'])
+    
+    def predict(self, images: List[np.ndarray], conf: float, classes: List[int] = None,
+                imgsz: int = None) -> List[Prediction]:
+        # Exports are dynamic, so any multiple of 32 can override the default size
+        if not images:
+            return []
+        
+        size = imgsz or self.imgsz
+        letterboxed = [letterbox(image, size) for image in images]
+        batch = np.stack([padded for padded, _, _ in letterboxed])
+        batch = np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+        
+        # (B, 4 + num_classes, anchors) -> (B, anchors, 4 + num_classes)
+        outputs = self.session.run(None, {self.input_name: batch})[0].transpose(0, 2, 1)
+        
+        return [self._postprocess(output, scale, pad, image.shape, conf, classes)
+                for output, (_, scale, pad), image in zip(outputs, letterboxed, images)]
+    
+    def _postprocess(self, output, scale, pad, image_shape, conf, classes) -> Prediction:
+        scores = output[:, 4:]
+        if classes is not None:
+            # Only the requested classes compete for each anchor
+            masked = np.full_like(scores, -1.0)
+            masked[:, classes] = scores[:, classes]
+            scores = masked
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        
+        keep = confidences > conf
+        if not keep.any():
+            return _empty_prediction()
+        cxcywh, confidences, class_ids = output[keep, :4], confidences[keep], class_ids[keep]
+        
+        xyxy = np.concatenate([cxcywh[:, :2] - cxcywh[:, 2:] / 2,
+                               cxcywh[:, :2] + cxcywh[:, 2:] / 2], axis=1)
+        xyxy = (xyxy - np.array(pad * 2, dtype=np.float32)) / scale
+        h, w = image_shape[:2]
+        xyxy = np.clip(xyxy, 0, [w, h, w, h])
+        
+        # Class-aware NMS by offsetting boxes of different classes apart
+        offset_boxes = xyxy + (class_ids * 4096.0)[:, None]
+        nms_boxes = np.concatenate([offset_boxes[:, :2], offset_boxes[:, 2:] - offset_boxes[:, :2]], axis=1)
+        indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), confidences.tolist(), conf, self.iou_threshold)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        
+        return (xyxy[indices].astype(np.float32), confidences[indices].astype(np.float32),
+                class_ids[indices].astype(np.int64))
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8', 'openvino')
+
+# Heavy runtime library each backend imports when it is created
+BACKEND_MODULES = {'torch': 'ultralytics', 'onnx': 'onnxruntime',
+                   'onnx-int8': 'onnxruntime', 'openvino': 'onnxruntime'}
+
+def create_backend(name: str, model_name: str, imgsz: int = None, cache_dir: str = None):
+    """Build a detector backend by name: 'torch', 'onnx', 'onnx-int8' or 'openvino'"""
+    if name == 'torch':
+        return TorchBackend(model_name, imgsz)
+    if name in ('onnx', 'onnx-int8', 'openvino'):
+        return OnnxBackend(model_name, imgsz or 640, int8=(name == 'onnx-int8'),
+                           cache_dir=cache_dir, openvino=(name == 'openvino'))
+    raise ValueError(f"Unknown backend: {name} (expected one of {BACKENDS})")
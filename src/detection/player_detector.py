@@ -1,36 +1,124 @@
-# src/detection/player_detector.py
 import cv2
+import time
 import numpy as np
-from ultralytics import YOLO
-from typing import List, Dict
+from typing import List, Dict, Tuple
+from detection.adaptive import InputSizePolicy, TiledRefinement
+from detection.backends import create_backend
+from detection.roi import PlayArea
+from utils.profiler import Profiler
 
 class PlayerDetector:
-    def __init__(self, model_size='yolov8m.pt', conf_threshold=0.3):
-        print("Loading YOLO model...")
-        self.model = YOLO(model_size)
+    def __init__(self, model_size='yolov8m.pt', conf_threshold=0.3, roi: PlayArea = None,
+                 backend='torch', imgsz=None, input_size: InputSizePolicy = None,
+                 refinement: TiledRefinement = None, profiler: Profiler = None):
+        """
+        Args:
+            model_size: YOLO weights to load
+            conf_threshold: Minimum detection confidence
+            roi: Optional play area; once it is ready, inference runs on its
+                bounding crop only and detections outside it are dropped
+            backend: 'torch' (Ultralytics), 'onnx', 'onnx-int8' or 'openvino'
+                (ONNX exports are cached on disk per model and input size), or
+                a backend instance with class_names and predict() (see
+                detection.backends), used as is
+            imgsz: Model input size (ONNX backends default to 640)
+            input_size: Optional policy choosing imgsz per segment from the
+                observed player sizes (overrides `imgsz`)
+            refinement: Optional low-res pass with high-res tiles where small
+                players are expected
+            profiler: Records preprocess / inference / postprocess spans
+        """
+        self.backend_name = backend if isinstance(backend, str) else type(backend).__name__
+        print(f"Loading YOLO model ({self.backend_name} backend)...")
+        self.model_size = model_size
+        self.backend = create_backend(backend, model_size, imgsz) if isinstance(backend, str) else backend
         self.conf_threshold = conf_threshold
-        self.class_names = self.model.names
+        self.roi = roi
+        self.input_size = input_size
+        self.refinement = refinement
+        self.profiler = profiler or Profiler(enabled=False)
+        # Upper bound on the input size, lowered to shed load (live mode)
+        self.max_imgsz = None
+        self.class_names = self.backend.class_names
+        self.person_class_id = next(
+            class_id for class_id, name in self.class_names.items() if name == 'person'
+        )
+        self.inference_count = 0
         print("✓ YOLO model loaded successfully!")
-        
+    
     def detect_players(self, frame: np.ndarray) -> List[Dict]:
         """Detect players in a single frame"""
-        results = self.model(frame, conf=self.conf_threshold, verbose=False)
+        boxes, confidences = self.detect_batch([frame])[0]
+        return self.to_detections(boxes, confidences)
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Detect players in several frames with a single model call
+        
+        Returns one (boxes, confidences) pair per frame: an (N, 4) float32
+        array of xyxy boxes and an (N,) float32 array of confidences.
+        """
+        if not frames:
+            return []
+        
+        use_roi = self.roi is not None and self.roi.ready
+        inputs, offsets = list(frames), [(0, 0)] * len(frames)
+        if use_roi:
+            # The model letterboxes each crop itself; only the play area is resized
+            with self.profiler.span('preprocess'):
+                inputs, offsets = zip(*(self.roi.crop(frame) for frame in frames))
         
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    confidence = box.conf.item()
-                    class_id = int(box.cls.item())
-                    class_name = self.class_names[class_id]
-                    
-                    if class_name == 'person' and confidence > self.conf_threshold:
-                        x1, y1, x2, y2 = box.xyxy[0].tolist()
-                        detections.append({
-                            'bbox': [x1, y1, x2, y2],
-                            'confidence': confidence,
-                            'class_name': class_name
-                        })
+        imgsz = self._imgsz()
+        start_time = time.perf_counter()
+        detections = self._predict(list(inputs), imgsz)
+        if self.refinement is not None:
+            detections = [self.refinement.refine(image, boxes, confidences, self._predict)
+                          for image, (boxes, confidences) in zip(inputs, detections)]
+        if self.input_size is not None:
+            self.input_size.record_latency(imgsz, time.perf_counter() - start_time)
+            for image, (boxes, _) in zip(inputs, detections):
+                self.input_size.observe(boxes, image.shape)
         
-        return detections
\ No newline at end of file
+        if use_roi:
+            with self.profiler.span('postprocess'):
+                detections = [self._map_to_frame(boxes, confidences, offset, frame.shape)
+                              for (boxes, confidences), offset, frame in zip(detections, offsets, frames)]
+        return detections
+    
+    def _imgsz(self):
+        if self.input_size is not None:
+            imgsz = self.input_size.imgsz
+        elif self.refinement is not None:
+            imgsz = self.refinement.low_imgsz
+        else:
+            imgsz = None
+        if self.max_imgsz is not None:
+            imgsz = min(imgsz or self.max_imgsz, self.max_imgsz)
+        return imgsz
+    
+    def _predict(self, images: List[np.ndarray], imgsz: int = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        # Backend-internal letterboxing/NMS is part of the inference span
+        with self.profiler.span('inference'):
+            predictions = self.backend.predict(images, self.conf_threshold,
+                                               classes=[self.person_class_id], imgsz=imgsz)
+        self.inference_count += 1
+        with self.profiler.span('postprocess'):
+            return [self._extract_players(*prediction) for prediction in predictions]
+    
+    def _map_to_frame(self, boxes, confidences, offset, frame_shape):
+        """Shift crop boxes back to frame coordinates and drop those outside the play area"""
+        boxes = boxes + np.array(offset * 2, dtype=np.float32)
+        keep = self.roi.contains(boxes, frame_shape)
+        return boxes[keep], confidences[keep]
+    
+    def _extract_players(self, xyxy, confidences, class_ids) -> Tuple[np.ndarray, np.ndarray]:
+        keep = (class_ids == self.person_class_id) & (confidences > self.conf_threshold)
+        return xyxy[keep], confidences[keep]
+    
+    @staticmethod
+    def to_detections(boxes: np.ndarray, confidences: np.ndarray) -> List[Dict]:
+        """Convert detection arrays to the per-detection dict format"""
+        return [
+            {'bbox': bbox, 'confidence': confidence, 'class_name': 'person'}
+            for bbox, confidence in zip(boxes.tolist(), confidences.tolist())
+        ]
\ No newline at end of file
@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+import threading
+from typing import List, Dict, Tuple
+from utils.picklable_lock import PicklableLock
+
+class PlayArea(PicklableLock):
+    def __init__(self, polygon=None, warmup_frames=30, margin=0.1):
+        """
+        Play-area region of interest for the detector
+        
+        Args:
+            polygon: Static play area as [(x, y), ...] in frame pixels. When
+                None, the area is derived from the convex hull of track boxes
+                seen in the first `warmup_frames` frames of each video
+            warmup_frames: Frames observed before an automatic area is fixed
+            margin: Relative growth of the automatic hull around its centroid
+        """
+        self.static_polygon = None if polygon is None else np.asarray(polygon, dtype=np.float32)
+        self.warmup_frames = warmup_frames
+        self.margin = margin
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Forget the automatic area (static polygons are kept)"""
+        self.polygon = self.static_polygon
+        self._points = []
+        self._observed_frames = 0
+        self._mask = None
+        self._rect = None
+    
+    @property
+    def ready(self) -> bool:
+        return self.polygon is not None
+    
+    def observe(self, tracks: List[Dict]):
+        """Collect track corners during warmup and fix the hull once it ends"""
+        if self.ready:
+            return
+        self._points.extend(self._corners(t['bbox']) for t in tracks)
+        self._observed_frames += 1
+        if self._observed_frames >= self.warmup_frames and self._points:
+            points = np.concatenate(self._points).astype(np.float32)
+            hull = cv2.convexHull(points).reshape(-1, 2)
+            center = hull.mean(axis=0)
+            self.polygon = center + (hull - center) * (1 + self.margin)
+            self._points = []
+    
+    @staticmethod
+    def _corners(bbox):
+        x1, y1, x2, y2 = bbox
+        return np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32)
+    
+    def _prepare(self, frame_shape):
+        # Built lazily (and once) because the frame size is only known at inference time
+        with self._lock:
+            if self._mask is not None and self._mask.shape == tuple(frame_shape[:2]):
+                return
+            h, w = frame_shape[:2]
+            mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.fillPoly(mask, [np.round(self.polygon).astype(np.int32)], 1)
+            
+            x, y, rect_w, rect_h = cv2.boundingRect(np.round(self.polygon).astype(np.int32))
+            x1, y1 = max(0, x), max(0, y)
+            x2, y2 = min(w, x + rect_w), min(h, y + rect_h)
+            self._rect = (x1, y1, max(x2, x1 + 1), max(y2, y1 + 1))
+            self._mask = mask.astype(bool)
+    
+    def crop(self, frame: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """View of the play area's bounding rectangle and its (x, y) offset"""
+        self._prepare(frame.shape)
+        x1, y1, x2, y2 = self._rect
+        return frame[y1:y2, x1:x2], (x1, y1)
+    
+    def contains(self, boxes: np.ndarray, frame_shape) -> np.ndarray:
+        """Boolean mask of boxes whose bottom-center (the player's feet) is in the area"""
+        self._prepare(frame_shape)
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        h, w = self._mask.shape
+        xs = np.clip(((boxes[:, 0] + boxes[:, 2]) / 2).astype(np.int64), 0, w - 1)
+        ys = np.clip(boxes[:, 3].astype(np.int64), 0, h - 1)
+        return self._mask[ys, xs]
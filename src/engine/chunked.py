@@ -0,0 +1,321 @@
+import json
+import multiprocessing
+import os
+import pickle
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import linear_sum_assignment
+from typing import List, Dict, Tuple, Callable
+from tracking.player_tracker import iou_matrix
+from utils.results_io import ResultsWriter, ResultsReader
+from utils.video_io import VideoSource
+
+def plan_chunks(total_frames: int, chunk_frames: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    0-based [start, stop) frame ranges; each chunk also runs `overlap`
+    frames into the next one so track IDs can be stitched across the cut
+    """
+    return [(start, min(start + chunk_frames + overlap, total_frames))
+            for start in range(0, total_frames, chunk_frames)]
+
+# Pipeline options whose state evolves over a video; checkpoints carry it
+# so a resumed chunk continues exactly where the interrupted one stopped
+STATEFUL_OPTIONS = ('play_area', 'input_size', 'refinement')
+
+# Per-process pipeline for parallel chunks, created once by _init_worker
+_worker_pipeline = None
+
+def _init_worker(pipeline_factory):
+    global _worker_pipeline
+    _worker_pipeline = pipeline_factory()
+
+def _run_chunk_in_worker(processor, video_path, index, chunk):
+    return processor.process_chunk(_worker_pipeline, video_path, index, chunk)
+
+class ChunkedProcessor:
+    def __init__(self, work_dir: str, chunk_frames: int = 1800, overlap: int = 15,
+                 checkpoint_every: int = 300, min_stitch_votes: int = 3, stitch_iou: float = 0.5):
+        """
+        Split a video into frame ranges processed independently and resumably
+        
+        Each chunk seeks to its first frame (CAP_PROP_POS_FRAMES), runs
+        detection, pose and tracking from a fresh tracker and streams its
+        results to <work_dir>/part_XXXX/. Every `checkpoint_every` frames the
+        results are flushed and the tracker, automatic play area, input size
+        policy and tile refinement state pickled, so a rerun with the same
+        work_dir skips finished chunks and resumes unfinished ones at their
+        last checkpoint as if never interrupted. Chunks then get stitched: the `overlap`
+        frames a chunk shares with its predecessor are matched by IoU and
+        its track IDs renamed to the predecessor's.
+        
+        Args:
+            work_dir: Checkpoints, per-chunk results and the merged results
+            chunk_frames: Frames per chunk (excluding the overlap)
+            overlap: Frames each chunk re-processes from the next one
+            checkpoint_every: Frames between checkpoints within a chunk
+            min_stitch_votes: Overlap frames two tracks must match in to be joined
+            stitch_iou: IoU for two tracks to match in an overlap frame
+        """
+        self.work_dir = work_dir
+        self.chunk_frames = chunk_frames
+        self.overlap = overlap
+        self.checkpoint_every = checkpoint_every
+        self.min_stitch_votes = min_stitch_votes
+        self.stitch_iou = stitch_iou
+    
+    def _chunk_dir(self, index):
+        return os.path.join(self.work_dir, f"part_{index:04d}")
+    
+    def _write_manifest(self, video_path, chunks):
+        manifest = {'video_path': os.path.abspath(video_path), 'chunk_frames': self.chunk_frames,
+                    'overlap': self.overlap, 'chunks': chunks}
+        path = os.path.join(self.work_dir, 'job.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                previous = json.load(f)
+            if previous != json.loads(json.dumps(manifest)):
+                raise ValueError(f"{self.work_dir} holds a different chunked job; "
+                                 f"use a new work_dir or delete it")
+            return
+        os.makedirs(self.work_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+    
+    def run(self, pipeline, video_path: str, max_frames: int = None, workers: int = 1,
+            pipeline_factory: Callable = None) -> Tuple[ResultsReader, Dict]:
+        """
+        Process (or resume) a video in chunks and return (merged results, metrics)
+        
+        With workers > 1, chunks run in a spawn process pool, each process
+        building its pipeline with `pipeline_factory` (a picklable callable).
+        """
+        source = VideoSource(video_path)
+        if not source.isOpened():
+            raise IOError(f"Could not open video file {video_path}")
+        total_frames = source.frame_count
+        source.release()
+        if max_frames is not None:
+            total_frames = min(total_frames, max_frames)
+        
+        chunks = plan_chunks(total_frames, self.chunk_frames, self.overlap)
+        self._write_manifest(video_path, chunks)
+        print(f"Processing {os.path.basename(video_path)} in {len(chunks)} chunk(s) "
+              f"of {self.chunk_frames} frames")
+        
+        run_start = time.perf_counter()
+        if workers > 1:
+            if pipeline_factory is None:
+                raise ValueError("Parallel chunks need a picklable pipeline_factory")
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(pipeline_factory,)) as pool:
+                chunk_metrics = list(pool.map(_run_chunk_in_worker, [self] * len(chunks),
+                                              [video_path] * len(chunks), range(len(chunks)), chunks))
+        else:
+            chunk_metrics = [self.process_chunk(pipeline, video_path, i, chunk)
+                             for i, chunk in enumerate(chunks)]
+        
+        results = self.merge(chunks)
+        wall_time = time.perf_counter() - run_start
+        return results, self._combine_metrics(chunk_metrics, len(results), wall_time)
+    
+    def process_chunk(self, pipeline, video_path: str, index: int, chunk: Tuple[int, int]) -> Dict:
+        """Process one chunk, resuming from its checkpoint; returns its performance metrics"""
+        chunk_dir = self._chunk_dir(index)
+        state_path = os.path.join(chunk_dir, 'state.pkl')
+        state = None
+        if os.path.exists(state_path):
+            with open(state_path, 'rb') as f:
+                state = pickle.load(f)
+            if state['done']:
+                return state['metrics']
+        
+        start, stop = chunk
+        pipeline.reset()
+        next_frame = start
+        writer_state = None
+        if state is not None:
+            print(f"  Chunk {index}: resuming at frame {state['next_frame'] + 1}")
+            next_frame = state['next_frame']
+            writer_state = state['writer']
+            pipeline.tracker = state['tracker']
+            if pipeline.tracker.reid is not None:
+                pipeline.reid = pipeline.tracker.reid
+            for name, saved in state['options'].items():
+                # Restored in place: a loaded detector holds these objects
+                vars(getattr(pipeline, name)).update(vars(saved))
+        
+        writer = ResultsWriter(chunk_dir, resume=writer_state)
+        pipeline.open_cache(video_path)
+        cap = VideoSource(video_path, profiler=pipeline.profiler, start_frame=next_frame)
+        frames_done = 0
+        run_start = time.perf_counter()
+        try:
+            while next_frame < stop:
+                frame, release = cap.read()
+                if frame is None:
+                    break
+                inference = pipeline._infer(frame, frame_number=next_frame + 1)
+                frames_done += 1
+                pipeline._finish_frame(frame, frames_done, inference, writer, render=False,
+                                       frame_number=next_frame + 1)
+                release()
+                next_frame += 1
+                if (next_frame - start) % self.checkpoint_every == 0 and next_frame < stop:
+                    self._checkpoint(state_path, pipeline, writer, next_frame)
+        finally:
+            cap.release()
+            pipeline.close_cache()
+        
+        writer.close()
+        pipeline.metrics['wall_time'] = time.perf_counter() - run_start
+        metrics = pipeline.calculate_performance_metrics()
+        self._save_state(state_path, {'done': True, 'metrics': metrics})
+        print(f"  Chunk {index}: frames {start + 1}-{next_frame} done")
+        return metrics
+    
+    def _checkpoint(self, state_path, pipeline, writer, next_frame):
+        writer.flush()
+        options = {name: getattr(pipeline, name) for name in STATEFUL_OPTIONS
+                   if getattr(pipeline, name) is not None}
+        self._save_state(state_path, {'done': False, 'next_frame': next_frame,
+                                      'writer': writer.state(), 'tracker': pipeline.tracker,
+                                      'options': options})
+    
+    @staticmethod
+    def _save_state(path, state):
+        # Write-then-rename so a crash never leaves a torn checkpoint
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(tmp_path, path)
+    
+    @staticmethod
+    def _overlap_tracks(reader, first, last):
+        """{frame_number: (track ids, boxes)} for frames in [first, last], read from the columns"""
+        frames = {}
+        for chunk in reader.chunks():
+            frame_numbers = np.asarray(chunk['frame_numbers'])
+            if len(frame_numbers) == 0 or frame_numbers[-1] < first or frame_numbers[0] > last:
+                continue
+            offsets = np.concatenate([[0], np.cumsum(chunk['track_counts'])])
+            for i in np.flatnonzero((frame_numbers >= first) & (frame_numbers <= last)):
+                t0, t1 = offsets[i], offsets[i + 1]
+                frames[int(frame_numbers[i])] = (np.asarray(chunk['track_ids'][t0:t1]).tolist(),
+                                                 np.asarray(chunk['track_boxes'][t0:t1]))
+        return frames
+    
+    def _stitch(self, previous: Dict, current: Dict) -> Dict[int, int]:
+        """Map current-chunk track IDs to previous-chunk IDs by IoU votes over the overlap"""
+        votes = {}
+        for frame_number, (ids, boxes) in current.items():
+            prev_ids, prev_boxes = previous.get(frame_number, ([], None))
+            if not ids or not prev_ids:
+                continue
+            iou = iou_matrix(boxes, prev_boxes)
+            rows, cols = linear_sum_assignment(-iou)
+            for r, c in zip(rows, cols):
+                if iou[r, c] >= self.stitch_iou:
+                    votes[(ids[r], prev_ids[c])] = votes.get((ids[r], prev_ids[c]), 0) + 1
+        if not votes:
+            return {}
+        
+        current_ids = sorted({a for a, _ in votes})
+        previous_ids = sorted({b for _, b in votes})
+        counts = np.zeros((len(current_ids), len(previous_ids)))
+        for (a, b), count in votes.items():
+            counts[current_ids.index(a), previous_ids.index(b)] = count
+        rows, cols = linear_sum_assignment(-counts)
+        return {current_ids[r]: previous_ids[c] for r, c in zip(rows, cols)
+                if counts[r, c] >= self.min_stitch_votes}
+    
+    def merge(self, chunks: List[Tuple[int, int]]) -> ResultsReader:
+        """Write all chunks into <work_dir>/merged with stitched, globally unique track IDs"""
+        merged_dir = os.path.join(self.work_dir, 'merged')
+        stitching = []
+        next_id = 1
+        previous_map = {}
+        previous_reader = None
+        
+        with ResultsWriter(merged_dir) as writer:
+            for index, (start, stop) in enumerate(chunks):
+                reader = ResultsReader(self._chunk_dir(index))
+                id_map = {}
+                first_output = start + 1
+                if previous_reader is not None and self.overlap:
+                    last_overlap = min(start + self.overlap, stop)
+                    links = self._stitch(self._overlap_tracks(previous_reader, start + 1, last_overlap),
+                                         self._overlap_tracks(reader, start + 1, last_overlap))
+                    id_map = {local: previous_map[prev] for local, prev in links.items()
+                              if prev in previous_map}
+                    # The predecessor already wrote the overlap frames
+                    first_output = last_overlap + 1
+                
+                def global_id(local_id):
+                    nonlocal next_id
+                    if local_id not in id_map:
+                        id_map[local_id] = next_id
+                        next_id += 1
+                    return id_map[local_id]
+                
+                for frame in reader:
+                    if frame['frame_number'] < first_output:
+                        # Overlap tracks still need IDs so later links resolve
+                        for track in frame['tracks']:
+                            global_id(track['track_id'])
+                        continue
+                    for track in frame['tracks']:
+                        track['track_id'] = global_id(track['track_id'])
+                    for pose in frame['poses']:
+                        if pose['track_id'] is not None:
+                            pose['track_id'] = global_id(pose['track_id'])
+                    writer.append(frame['frame_number'], frame['detections'], frame['poses'],
+                                  frame['tracks'], frame['keyframe'])
+                
+                stitching.append({'chunk': index, 'frames': [start + 1, stop],
+                                  'id_map': {str(k): v for k, v in sorted(id_map.items())}})
+                previous_map, previous_reader = id_map, reader
+        
+        with open(os.path.join(merged_dir, 'stitching.json'), 'w') as f:
+            json.dump(stitching, f, indent=2)
+        return ResultsReader(merged_dir)
+    
+    @staticmethod
+    def _combine_metrics(chunk_metrics: List[Dict], total_frames: int, wall_time: float) -> Dict:
+        """
+        Frame-weighted averages over chunks; total_frames is the merged frame
+        count (overlap frames once) and fps is it per elapsed wall_time of the
+        whole run, so parallel chunks show their speedup. chunk_time_total
+        adds up the chunks' own wall times.
+        """
+        processed_frames = sum(m['total_frames'] for m in chunk_metrics)
+        chunk_time_total = sum(m['wall_time'] for m in chunk_metrics)
+        
+        def weighted(key):
+            if processed_frames == 0:
+                return 0.0
+            return sum(m[key] * m['total_frames'] for m in chunk_metrics) / processed_frames
+        
+        cache = {}
+        for m in chunk_metrics:
+            for key in ('hits', 'misses', 'stored_frames'):
+                if key in m.get('inference_cache', {}):
+                    cache[key] = cache.get(key, 0) + m['inference_cache'][key]
+        if cache:
+            lookups = cache['hits'] + cache['misses']
+            cache['hit_rate'] = cache['hits'] / lookups if lookups else 0.0
+        
+        return {
+            'average_detection_time': weighted('average_detection_time'),
+            'average_pose_time': weighted('average_pose_time'),
+            'average_tracking_time': weighted('average_tracking_time'),
+            'average_model_calls_per_frame': weighted('average_model_calls_per_frame'),
+            'total_frames': total_frames,
+            'processed_frames': processed_frames,
+            'wall_time': wall_time,
+            'chunk_time_total': chunk_time_total,
+            'fps': total_frames / wall_time if wall_time > 0 else 0,
+            'inference_cache': cache,
+            'chunks': len(chunk_metrics)
+        }
@@ -0,0 +1,208 @@
+import contextlib
+import json
+import sys
+import time
+import numpy as np
+from typing import List, Dict
+from tracking.motion import KeyframeScheduler, OpticalFlowPropagator
+from utils.stats import RunningStats, StreamingHistogram
+from utils.video_io import LiveVideoReader
+
+# Cheapest work last: pose goes first, then detector resolution, then
+# detection frequency (tracks are propagated by optical flow in between)
+DEGRADATION_LEVELS = [
+    {'name': 'full', 'pose': True, 'max_imgsz': None, 'stride': 1},
+    {'name': 'no_pose', 'pose': False, 'max_imgsz': None, 'stride': 1},
+    {'name': 'imgsz_480', 'pose': False, 'max_imgsz': 480, 'stride': 1},
+    {'name': 'imgsz_320', 'pose': False, 'max_imgsz': 320, 'stride': 1},
+    {'name': 'stride_2', 'pose': False, 'max_imgsz': 320, 'stride': 2},
+    {'name': 'stride_3', 'pose': False, 'max_imgsz': 320, 'stride': 3},
+]
+
+class LatencyBudget:
+    def __init__(self, budget_ms: float = 100.0, levels: List[Dict] = None, smoothing: float = 0.2,
+                 degrade_after: int = 3, recover_after: int = 30, headroom: float = 0.6):
+        """
+        Degradation ladder driven by end-to-end frame latency
+        
+        An exponential moving average of the latency from capture to output
+        is compared with the budget. After `degrade_after` consecutive frames
+        over it the next (cheaper) level is taken; after `recover_after`
+        consecutive frames under `headroom` x budget one level is given back.
+        A recovery that is undone within `recover_after` frames doubles the
+        wait before the next attempt (up to 8x), so the level does not keep
+        flapping when the cheaper level barely fits the budget.
+        
+        Args:
+            budget_ms: Per-frame latency budget
+            levels: Degradation levels, most expensive first (see DEGRADATION_LEVELS)
+            smoothing: Weight of the newest frame in the moving average
+            degrade_after: Frames over budget before degrading
+            recover_after: Frames with headroom before recovering a level
+            headroom: Fraction of the budget latency must stay under to recover
+        """
+        self.budget = budget_ms / 1000.0
+        self.levels = levels or DEGRADATION_LEVELS
+        self.smoothing = smoothing
+        self.degrade_after = degrade_after
+        self.recover_after = recover_after
+        self.headroom = headroom
+        self.reset()
+    
+    def reset(self):
+        self.level = 0
+        self.latency = None
+        self._over = 0
+        self._under = 0
+        self._since_change = 0
+        self._recovered = False
+        self._recovery_wait = self.recover_after
+        self.changes = 0
+    
+    @property
+    def settings(self) -> Dict:
+        return self.levels[self.level]
+    
+    def update(self, latency: float) -> bool:
+        """Account one frame's latency (seconds); True when the level changed"""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        
+        self._over = self._over + 1 if self.latency > self.budget else 0
+        self._under = self._under + 1 if self.latency < self.headroom * self.budget else 0
+        self._since_change += 1
+        if self._recovered and self._since_change > self.recover_after:
+            # The last recovery held
+            self._recovered = False
+            self._recovery_wait = self.recover_after
+        
+        if self._over >= self.degrade_after and self.level < len(self.levels) - 1:
+            if self._recovered:
+                self._recovery_wait = min(2 * self._recovery_wait, 8 * self.recover_after)
+            self.level += 1
+            self._recovered = False
+        elif self._under >= self._recovery_wait and self.level > 0:
+            self.level -= 1
+            self._recovered = True
+        else:
+            return False
+        self._over = self._under = self._since_change = 0
+        self.changes += 1
+        return True
+
+class LiveRunner:
+    def __init__(self, pipeline, budget: LatencyBudget = None, output=None):
+        """
+        Real-time processing of a live source under a latency budget
+        
+        Frames are captured on a background thread that only keeps the
+        newest one, so when processing falls behind stale frames are
+        dropped rather than queued. The budget's degradation level decides
+        per frame whether pose runs, the detector's maximum input size and
+        the detection stride. Each processed frame is written to `output`
+        (default stdout) as one JSON line; log messages go to stderr while
+        running so the stream stays machine-readable.
+        
+        Args:
+            pipeline: SportsPlayerTracker providing models, tracker and metrics
+            budget: Latency budget and degradation ladder
+            output: Text stream receiving the JSON lines
+        """
+        self.pipeline = pipeline
+        self.budget = budget or LatencyBudget()
+        self.output = output
+        self.stats = {}
+    
+    def run(self, source: str, max_frames: int = None, realtime: bool = None) -> Dict:
+        """Process `source` until it ends (or max_frames frames); returns the run's stats"""
+        output = self.output or sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            return self._run(source, max_frames, realtime, output)
+    
+    def _run(self, source, max_frames, realtime, output):
+        pipeline = self.pipeline
+        self.budget.reset()
+        # Models are loaded and warmed up before frames start arriving
+        pipeline.warmup()
+        detector = pipeline.detector
+        
+        reader = LiveVideoReader(source, realtime=realtime, profiler=pipeline.profiler)
+        if not reader.isOpened():
+            print(f"❌ Error: Could not open live source {source}")
+            return {}
+        
+        keyframes = KeyframeScheduler(1)
+        flow = OpticalFlowPropagator()
+        latency_stats = RunningStats()
+        latency_histogram = StreamingHistogram(-1.0, 4.0, bins=250)
+        level_frames = {level['name']: 0 for level in self.budget.levels}
+        over_budget = 0
+        processed = 0
+        
+        print(f"Live: {source} ({reader.width}x{reader.height} @ {reader.fps:.1f} fps, "
+              f"budget {self.budget.budget * 1000:.0f} ms)")
+        run_start = time.perf_counter()
+        try:
+            while max_frames is None or processed < max_frames:
+                latest = reader.read_latest()
+                if latest is None:
+                    break
+                frame_number, frame, capture_time = latest
+                settings = self.budget.settings
+                detector.max_imgsz = settings['max_imgsz']
+                keyframes.stride = settings['stride']
+                
+                processed += 1
+                inference = pipeline._keyframe_inference(frame, keyframes, flow,
+                                                         skip_pose=not settings['pose'])
+                frame_result, _ = pipeline._finish_frame(frame, processed, inference, render=False,
+                                                         frame_number=frame_number)
+                latency = time.perf_counter() - capture_time
+                
+                output.write(json.dumps({
+                    'frame': frame_number,
+                    'latency_ms': round(latency * 1000, 2),
+                    'level': settings['name'],
+                    'keyframe': inference.get('keyframe', True),
+                    'dropped': reader.dropped,
+                    'tracks': [{'track_id': track['track_id'],
+                                'bbox': [round(float(v), 1) for v in track['bbox']]}
+                               for track in frame_result['tracks']]
+                }) + "\n")
+                output.flush()
+                
+                latency_stats.update(latency * 1000)
+                latency_histogram.update([np.log10(max(latency * 1000, 0.1))])
+                level_frames[settings['name']] += 1
+                over_budget += latency > self.budget.budget
+                if self.budget.update(latency):
+                    print(f"  Frame {frame_number}: level {self.budget.settings['name']} "
+                          f"(latency {self.budget.latency * 1000:.0f} ms)")
+        except KeyboardInterrupt:
+            print("Live: interrupted")
+        finally:
+            reader.release()
+            detector.max_imgsz = None
+        
+        wall_time = time.perf_counter() - run_start
+        self.stats = {
+            'captured': reader.captured,
+            'processed': processed,
+            'dropped': reader.dropped,
+            'drop_rate': reader.dropped / reader.captured if reader.captured else 0.0,
+            'wall_time': wall_time,
+            'fps': processed / wall_time if wall_time > 0 else 0.0,
+            'budget_ms': self.budget.budget * 1000,
+            'over_budget': over_budget,
+            'latency_ms': dict(latency_stats.as_dict(), **{
+                f'p{q}': min(10 ** latency_histogram.quantile(q / 100), latency_stats.max)
+                for q in (50, 95, 99)
+            }),
+            'level_frames': level_frames,
+            'level_changes': self.budget.changes
+        }
+        print(f"✓ Live: {processed} frames processed, {reader.dropped} dropped, "
+              f"p95 latency {self.stats['latency_ms']['p95']:.1f} ms")
+        return self.stats
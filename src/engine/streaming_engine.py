@@ -0,0 +1,235 @@
+import cv2
+import os
+import queue
+import threading
+import time
+from typing import List, Dict
+
+class _StageTimer:
+    """Accumulates the time a stage spends working (not waiting on queues)"""
+    
+    def __init__(self):
+        self.busy = 0.0
+        self.items = 0
+        self._lock = threading.Lock()
+    
+    def add(self, seconds):
+        with self._lock:
+            self.busy += seconds
+            self.items += 1
+
+class StreamingEngine:
+    def __init__(self, pipeline, num_workers: int = 2, decode_queue_size: int = 8,
+                 result_queue_size: int = 8, encode_queue_size: int = 8):
+        """
+        Staged decode -> inference -> ordered tracking -> encode engine
+        
+        Decoding and encoding run on their own threads, detection and pose on
+        `num_workers` inference threads (each with its own models), and
+        tracking/annotation on the calling thread in strict frame order, so
+        detections and tracks are identical to SportsPlayerTracker.process_video.
+        Full-frame pose with several workers uses static-image graphs, since
+        each worker sees an interleaved subset of frames: poses are the same
+        from run to run but not video-mode smoothed as in process_video.
+        
+        Args:
+            pipeline: SportsPlayerTracker providing models, tracker and metrics
+            num_workers: Number of inference worker threads
+            decode_queue_size: Max decoded frames waiting for inference
+            result_queue_size: Max inferred frames waiting for tracking
+            encode_queue_size: Max annotated frames waiting for the encoder
+        """
+        self.pipeline = pipeline
+        self.num_workers = max(1, num_workers)
+        self.decode_queue_size = decode_queue_size
+        self.result_queue_size = result_queue_size
+        self.encode_queue_size = encode_queue_size
+        self.stats = {}
+    
+    def run(self, video_path: str, output_path: str = None, max_frames: int = 100,
+            results_writer=None) -> List[Dict]:
+        """
+        Process a video through the staged engine and return per-frame results
+        
+        With a results_writer, frames are streamed to it from the tracking
+        stage and the returned list stays empty.
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            print(f"❌ Error: Could not open video file {video_path}")
+            return []
+        
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        
+        out = None
+        if output_path:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        
+        # With an open inference cache, a worker loads its models on its first
+        # cache miss only (never, for a fully cached video)
+        cached_video = self.pipeline._cached_video
+        static_pose = self.num_workers > 1
+        worker_models = [None if cached_video is not None else self.pipeline.worker_models(i, static_pose)
+                         for i in range(self.num_workers)]
+        
+        decode_queue = queue.Queue(maxsize=self.decode_queue_size)
+        result_queue = queue.Queue(maxsize=self.result_queue_size)
+        encode_queue = queue.Queue(maxsize=self.encode_queue_size)
+        # Caps frames between the decoder and the tracking stage so the
+        # reorder buffer stays bounded even if one worker stalls
+        in_flight = threading.Semaphore(self.decode_queue_size + self.result_queue_size + self.num_workers)
+        stop = threading.Event()
+        errors = []
+        
+        timers = {name: _StageTimer() for name in ('decode', 'inference', 'tracking', 'encode')}
+        profiler = self.pipeline.profiler
+        
+        def decoder():
+            try:
+                frame_index = 0
+                while frame_index < max_frames and not stop.is_set():
+                    in_flight.acquire()
+                    start_time = time.perf_counter()
+                    with profiler.span('decode', frame_index + 1):
+                        ret, frame = cap.read()
+                    timers['decode'].add(time.perf_counter() - start_time)
+                    if not ret:
+                        in_flight.release()
+                        break
+                    decode_queue.put((frame_index, frame))
+                    frame_index += 1
+            except Exception as e:
+                errors.append(e)
+            finally:
+                for _ in range(self.num_workers):
+                    decode_queue.put(None)
+        
+        def inference_worker(worker_id):
+            models = worker_models[worker_id]
+            try:
+                while True:
+                    item = decode_queue.get()
+                    if item is None or stop.is_set():
+                        break
+                    frame_index, frame = item
+                    start_time = time.perf_counter()
+                    if models is None and frame_index + 1 not in cached_video:
+                        models = self.pipeline.worker_models(worker_id, static_pose)
+                    detector, pose_estimator = models or (None, None)
+                    inference = self.pipeline._infer(frame, detector=detector,
+                                                     pose_estimator=pose_estimator,
+                                                     frame_number=frame_index + 1)
+                    timers['inference'].add(time.perf_counter() - start_time)
+                    result_queue.put((frame_index, frame, inference))
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                result_queue.put(None)
+        
+        def encoder():
+            try:
+                while True:
+                    frame = encode_queue.get()
+                    if frame is None:
+                        break
+                    start_time = time.perf_counter()
+                    with profiler.span('encode'):
+                        out.write(frame)
+                    timers['encode'].add(time.perf_counter() - start_time)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+        
+        threads = [threading.Thread(target=decoder, daemon=True)]
+        threads += [threading.Thread(target=inference_worker, args=(i,), daemon=True)
+                    for i in range(self.num_workers)]
+        encoder_thread = threading.Thread(target=encoder, daemon=True) if out is not None else None
+        
+        print(f"Processing video: {os.path.basename(video_path)} "
+              f"({self.num_workers} inference workers)")
+        wall_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        if encoder_thread is not None:
+            encoder_thread.start()
+        
+        # Ordered tracking stage
+        frame_results = []
+        pending = {}
+        next_index = 0
+        finished_workers = 0
+        try:
+            while finished_workers < self.num_workers or pending:
+                if next_index not in pending:
+                    if finished_workers == self.num_workers:
+                        break  # a worker failed and dropped frames
+                    item = result_queue.get()
+                    if item is None:
+                        finished_workers += 1
+                    else:
+                        pending[item[0]] = item
+                    continue
+                
+                _, frame, inference = pending.pop(next_index)
+                next_index += 1
+                if next_index % 10 == 0:
+                    print(f"  Frame {next_index}")
+                
+                start_time = time.perf_counter()
+                frame_result, annotated_frame = self.pipeline._finish_frame(
+                    frame, next_index, inference, results_writer, render=out is not None
+                )
+                timers['tracking'].add(time.perf_counter() - start_time)
+                if frame_result is not None:
+                    frame_results.append(frame_result)
+                in_flight.release()
+                
+                if encoder_thread is not None:
+                    encode_queue.put(annotated_frame)
+        finally:
+            stop.set()
+            # Unblock a decoder waiting on the semaphore or a full queue
+            for _ in range(self.decode_queue_size + self.num_workers):
+                in_flight.release()
+            while any(thread.is_alive() for thread in threads):
+                for q in (decode_queue, result_queue):
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+                time.sleep(0.001)
+            if encoder_thread is not None:
+                encode_queue.put(None)
+                encoder_thread.join()
+            cap.release()
+            if out is not None:
+                out.release()
+        
+        wall_time = time.perf_counter() - wall_start
+        self.stats = self._utilization(timers, wall_time, next_index)
+        
+        if errors:
+            raise errors[0]
+        
+        print(f"✓ Processed {next_index} frames from {os.path.basename(video_path)}")
+        print(f"  Bottleneck stage: {self.stats['bottleneck']}")
+        return frame_results
+    
+    def _utilization(self, timers, wall_time, frame_count):
+        workers = {'decode': 1, 'inference': self.num_workers, 'tracking': 1, 'encode': 1}
+        utilization = {
+            name: timer.busy / (wall_time * workers[name]) if wall_time > 0 else 0.0
+            for name, timer in timers.items()
+        }
+        return {
+            'wall_time': wall_time,
+            'fps': frame_count / wall_time if wall_time > 0 else 0.0,
+            'stage_busy_time': {name: timer.busy for name, timer in timers.items()},
+            'stage_utilization': utilization,
+            'bottleneck': max(utilization, key=utilization.get)
+        }
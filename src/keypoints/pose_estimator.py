@@ -1,25 +1,82 @@
-# src/keypoints/pose_estimator.py
 import cv2
 import numpy as np
-import mediapipe as mp
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 
+class PosePolicy:
+    def __init__(self, min_box_height=48, min_box_area=0, min_confidence=0.4, max_players=None):
+        """
+        Decides which detections are worth running pose estimation on
+        
+        Args:
+            min_box_height: Skip boxes shorter than this (pixels)
+            min_box_area: Skip boxes smaller than this (pixels^2)
+            min_confidence: Skip detections below this confidence
+            max_players: Keep at most this many boxes, largest first
+        """
+        self.min_box_height = min_box_height
+        self.min_box_area = min_box_area
+        self.min_confidence = min_confidence
+        self.max_players = max_players
+    
+    def select(self, boxes: np.ndarray, confidences: np.ndarray = None) -> np.ndarray:
+        """Return indices of the boxes that should get a pose"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        heights = boxes[:, 3] - boxes[:, 1]
+        areas = heights * (boxes[:, 2] - boxes[:, 0])
+        
+        keep = (heights >= self.min_box_height) & (areas >= self.min_box_area)
+        if confidences is not None:
+            keep &= np.asarray(confidences) >= self.min_confidence
+        
+        indices = np.flatnonzero(keep)
+        if self.max_players is not None and len(indices) > self.max_players:
+            indices = indices[np.argsort(-areas[indices])[:self.max_players]]
+        return np.sort(indices)
+
 class PoseEstimator:
-    def __init__(self):
+    def __init__(self, num_workers=4, crop_padding=0.15, policy: PosePolicy = None, mode='frame',
+                 static_image_mode=False):
+        """
+        Args:
+            num_workers: Threads used for crop pose estimation
+            crop_padding: Crop margin around each box, relative to its longer side
+            policy: Which detections get a pose in process_crops
+            mode: 'frame' builds the full-frame (video) graph used by
+                process_frame; 'crops' only builds per-thread crop graphs
+            static_image_mode: Estimate each full frame on its own instead of
+                tracking the pose across consecutive frames
+        """
         print("Initializing MediaPipe Pose...")
+        # Imported here so that loading the pipeline does not pay for MediaPipe
+        import mediapipe as mp
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            min_detection_confidence=0.5
-        )
+        self.pose = None
+        if mode == 'frame':
+            self.pose = self.mp_pose.Pose(
+                static_image_mode=static_image_mode,
+                model_complexity=1,
+                min_detection_confidence=0.5
+            )
+        self.num_workers = num_workers
+        self.crop_padding = crop_padding
+        self.policy = policy or PosePolicy()
+        self._local = threading.local()
+        self._crop_graphs = []
+        self._graphs_lock = threading.Lock()
+        self._executor = None
+        self.inference_count = 0
         print("✓ MediaPipe Pose initialized!")
     
     def process_frame(self, frame: np.ndarray) -> List[Dict]:
         """Process frame for pose estimation"""
+        if self.pose is None:
+            raise RuntimeError("process_frame needs a PoseEstimator built with mode='frame'")
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         results = self.pose.process(rgb_frame)
+        self.inference_count += 1
         
         poses = []
         if results.pose_landmarks:
@@ -42,19 +99,114 @@ class PoseEstimator:
         
         return poses
     
-    def draw_poses(self, frame: np.ndarray, poses: List[Dict]) -> np.ndarray:
-        """Draw poses on frame"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(rgb_frame)
+    def process_crops(self, frame: np.ndarray, boxes: np.ndarray,
+                      confidences: np.ndarray = None) -> List[Dict]:
+        """
+        Run pose estimation on a padded crop around each selected detection
         
-        annotated_frame = frame.copy()
-        if results.pose_landmarks:
-            self.mp_drawing.draw_landmarks(
-                annotated_frame,
-                results.pose_landmarks,
-                self.mp_pose.POSE_CONNECTIONS,
-                self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                self.mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2)
+        Keypoints are mapped back to frame coordinates. Each pose carries the
+        'detection_index' of the box it came from so it can be linked to a track.
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        indices = self.policy.select(boxes, confidences)
+        if len(indices) == 0:
+            return []
+        
+        if self.num_workers > 1 and len(indices) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.num_workers)
+            results = list(self._executor.map(
+                lambda i: self._process_crop(frame, boxes[i], i), indices
+            ))
+        else:
+            results = [self._process_crop(frame, boxes[i], i) for i in indices]
+        self.inference_count += len(indices)
+        
+        return [pose for pose in results if pose is not None]
+    
+    def _thread_pose(self):
+        # MediaPipe graphs are not thread-safe, so each worker thread gets its own
+        pose = getattr(self._local, 'pose', None)
+        if pose is None:
+            pose = self.mp_pose.Pose(
+                static_image_mode=True,
+                model_complexity=1,
+                min_detection_confidence=0.5
             )
+            self._local.pose = pose
+            with self._graphs_lock:
+                self._crop_graphs.append(pose)
+        return pose
+    
+    def close(self):
+        """Shut down the crop thread pool and release the MediaPipe graphs"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._graphs_lock:
+            graphs, self._crop_graphs = self._crop_graphs, []
+        if self.pose is not None:
+            graphs.append(self.pose)
+            self.pose = None
+        for graph in graphs:
+            graph.close()
+        self._local = threading.local()
+    
+    def _process_crop(self, frame: np.ndarray, bbox: np.ndarray, detection_index: int):
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = bbox
+        pad = self.crop_padding * max(x2 - x1, y2 - y1)
+        cx1, cy1 = max(0, int(x1 - pad)), max(0, int(y1 - pad))
+        cx2, cy2 = min(w, int(x2 + pad)), min(h, int(y2 + pad))
+        if cx2 <= cx1 or cy2 <= cy1:
+            return None
         
-        return annotated_frame
\ No newline at end of file
+        crop = cv2.cvtColor(frame[cy1:cy2, cx1:cx2], cv2.COLOR_BGR2RGB)
+        results = self._thread_pose().process(crop)
+        if not results.pose_landmarks:
+            return None
+        
+        landmarks = np.array([[lm.x, lm.y, lm.visibility]
+                              for lm in results.pose_landmarks.landmark], dtype=np.float32)
+        keypoints = landmarks[:, :2] * [cx2 - cx1, cy2 - cy1] + [cx1, cy1]
+        
+        return {
+            'keypoints': keypoints,
+            'scores': landmarks[:, 2],
+            'bbox': [float(x1), float(y1), float(x2), float(y2)],
+            'detection_index': int(detection_index)
+        }
+    
+    def draw_poses(self, frame: np.ndarray, poses: List[Dict], min_score: float = 0.5,
+                   inplace: bool = False) -> np.ndarray:
+        """Draw poses on frame from their stored keypoints and scores"""
+        annotated_frame = frame if inplace else frame.copy()
+        return draw_pose_skeletons(annotated_frame, poses, min_score)
+
+_CONNECTIONS = None
+
+def pose_connections() -> np.ndarray:
+    """MediaPipe POSE_CONNECTIONS as an (E, 2) index array (no pose graph is created)"""
+    global _CONNECTIONS
+    if _CONNECTIONS is None:
+        import mediapipe as mp
+        _CONNECTIONS = np.array(sorted(mp.solutions.pose.POSE_CONNECTIONS), dtype=np.int64)
+    return _CONNECTIONS
+
+def draw_pose_skeletons(frame: np.ndarray, poses: List[Dict], min_score: float = 0.5) -> np.ndarray:
+    """Draw skeletons in place from stored keypoint and score arrays"""
+    connections = pose_connections()
+    for pose in poses:
+        keypoints = np.asarray(pose['keypoints'], dtype=np.float32)
+        scores = np.asarray(pose['scores'], dtype=np.float32)
+        visible = scores >= min_score
+        points = np.round(keypoints).astype(np.int32)
+        
+        edges = connections[visible[connections].all(axis=1)]
+        if len(edges):
+            cv2.polylines(frame, list(points[edges].reshape(-1, 2, 1, 2)),
+                          False, (0, 0, 255), 2)
+        for x, y in points[visible]:
+            cv2.circle(frame, (int(x), int(y)), 2, (0, 255, 0), 2)
+    
+    return frame
\ No newline at end of file
@@ -5,25 +5,261 @@ import json
 import time
 from datetime import datetime
 import os
+import importlib
+import functools
+import threading
+from detection.adaptive import InputSizePolicy, TiledRefinement
+from detection.backends import BACKEND_MODULES
 from detection.player_detector import PlayerDetector
-from keypoints.pose_estimator import PoseEstimator
+from detection.roi import PlayArea
+from keypoints.pose_estimator import PoseEstimator, PosePolicy, draw_pose_skeletons
+from tracking.appearance import AppearanceReID
 from tracking.player_tracker import PlayerTracker
+from engine.chunked import ChunkedProcessor
+from engine.live import LatencyBudget, LiveRunner
+from engine.streaming_engine import StreamingEngine
+from utils.inference_cache import InferenceCache
+from utils.results_io import ResultsWriter, ResultsReader
+from utils.profiler import Profiler
+from utils.stats import MetricStream, ResultsAccumulator, RunningStats
+from tracking.motion import KeyframeScheduler, OpticalFlowPropagator
+from utils.video_io import VideoSource, ThreadedVideoReader, VideoSink
 
 class SportsPlayerTracker:
-    def __init__(self):
+    def __init__(self, pose_mode: str = 'frame', pose_policy: PosePolicy = None, pose_workers: int = 4,
+                 play_area: PlayArea = None, model_size: str = 'yolov8m.pt', backend: str = 'torch',
+                 input_size: InputSizePolicy = None, refinement: TiledRefinement = None,
+                 profiler: Profiler = None, reid: AppearanceReID = None,
+                 conf_threshold: float = 0.3, inference_cache: InferenceCache = None):
+        """
+        Args:
+            pose_mode: 'frame' runs pose once on the full frame, 'crops' runs it
+                on a padded crop around each detection and links it to a track,
+                'none' skips pose estimation (MediaPipe is never loaded)
+            pose_policy: Which detections get a pose in 'crops' mode
+            pose_workers: Threads used for crop pose estimation
+            play_area: Optional detector region of interest (static polygon, or
+                derived from the first frames' tracks of each video)
+            model_size: YOLO weights used by the detector
+            backend: Detector inference backend ('torch', 'onnx', 'onnx-int8', 'openvino'),
+                or a picklable factory returning a backend instance (one is
+                created per detector, e.g. per streaming worker)
+            input_size: Optional adaptive detector input size, re-chosen per
+                segment of each video from the observed player sizes
+            refinement: Optional low-res detection pass with high-res tiles
+                around small players
+            profiler: Per-stage span profiler (a default one is created);
+                pass Profiler(enabled=False) to turn profiling off
+            reid: Optional appearance cue for the tracker (ambiguous matches
+                and ID recovery for players who leave and return)
+            conf_threshold: Minimum detection confidence
+            inference_cache: Optional on-disk cache of detector and pose
+                outputs; frames found in it skip inference (and model loading)
+        """
         print("Initializing Sports Player Tracker...")
-        self.detector = PlayerDetector()
-        self.pose_estimator = PoseEstimator()
-        self.tracker = PlayerTracker()
+        if pose_mode not in ('frame', 'crops', 'none'):
+            raise ValueError(f"Unknown pose_mode: {pose_mode}")
+        self.pose_mode = pose_mode
+        self.pose_policy = pose_policy
+        self.pose_workers = pose_workers
+        self.play_area = play_area
+        self.model_size = model_size
+        self.backend = backend
+        self.input_size = input_size
+        self.refinement = refinement
+        self.profiler = profiler or Profiler()
+        self.reid = reid
+        self.conf_threshold = conf_threshold
+        self.inference_cache = inference_cache
+        # Models are loaded on first use (see the detector / pose_estimator properties)
+        self._detector = None
+        self._pose_estimator = None
+        # Models of streaming workers, kept across videos: detectors of
+        # workers 1..N-1 and pose estimators by (worker, static_image_mode)
+        self._worker_detectors = []
+        self._worker_poses = {}
+        self._models_lock = threading.Lock()
+        self.startup_timings = {'import_time': 0.0, 'model_load_time': 0.0, 'warmup_time': None}
+        self.reset()
+        print("✓ Sports Player Tracker initialized!")
+    
+    def _timed_load(self, module_name, factory):
+        start_time = time.perf_counter()
+        if module_name is not None:
+            importlib.import_module(module_name)
+        self.startup_timings['import_time'] += time.perf_counter() - start_time
+        
+        start_time = time.perf_counter()
+        model = factory()
+        self.startup_timings['model_load_time'] += time.perf_counter() - start_time
+        return model
+    
+    @property
+    def detector(self):
+        if self._detector is None:
+            self._detector = self._timed_load(BACKEND_MODULES.get(self._backend_name), self._make_detector)
+        return self._detector
+    
+    @property
+    def pose_estimator(self):
+        if self._pose_estimator is None and self.pose_mode != 'none':
+            self._pose_estimator = self._timed_load('mediapipe', self._make_pose_estimator)
+        return self._pose_estimator
+    
+    def warmup(self, frame_shape=(720, 1280, 3)):
+        """Load both models and run one inference each so the first real frame is not slow"""
+        detector, pose_estimator = self.detector, self.pose_estimator
+        frame = np.zeros(frame_shape, dtype=np.uint8)
+        
+        start_time = time.perf_counter()
+        detector.detect_players(frame)
+        if pose_estimator is not None and self.pose_mode == 'crops':
+            h, w = frame_shape[:2]
+            pose_estimator.process_crops(frame, np.array([[0, 0, w, h]], dtype=np.float32))
+        elif pose_estimator is not None:
+            pose_estimator.process_frame(frame)
+        self.startup_timings['warmup_time'] = time.perf_counter() - start_time
+        return dict(self.startup_timings)
+    
+    def reset(self):
+        """Start a new video: fresh track IDs and per-video metrics"""
+        self.tracker = PlayerTracker(reid=self.reid)
+        if self.play_area is not None:
+            self.play_area.reset()
+        for policy in (self.input_size, self.refinement, self.reid):
+            if policy is not None:
+                policy.reset()
+        self.profiler.reset()
         self.metrics = {
-            'detection_times': [],
-            'pose_times': [],
-            'tracking_times': [],
-            'frame_counts': 0
+            'detection_times': MetricStream(),
+            'pose_times': MetricStream(),
+            'tracking_times': MetricStream(),
+            'model_calls': MetricStream(),
+            'frame_counts': 0,
+            'wall_time': 0.0
         }
-        print("✓ Sports Player Tracker initialized!")
+        self.results_stats = ResultsAccumulator()
+        self.keyframe_stats = {
+            'keyframes': 0,
+            'match_iou': RunningStats(),
+            'flow_time': MetricStream(),
+            'retrigger_reasons': {}
+        }
+        self.engine_stats = {}
+        self.live_stats = {}
+        self._cached_video = None
     
-    def process_video(self, video_path: str, output_path: str = None, max_frames: int = 100):
+    @property
+    def _backend_name(self):
+        """Backend name, or a stable description of a backend factory (cache keys)"""
+        if isinstance(self.backend, str):
+            return self.backend
+        qualname = getattr(self.backend, '__qualname__', None)
+        return f"{self.backend.__module__}.{qualname}" if qualname else repr(self.backend)
+    
+    def _make_detector(self):
+        backend = self.backend if isinstance(self.backend, str) else self.backend()
+        return PlayerDetector(self.model_size, self.conf_threshold, roi=self.play_area,
+                              backend=backend, input_size=self.input_size, refinement=self.refinement,
+                              profiler=self.profiler)
+    
+    def _make_pose_estimator(self, static_image_mode=False):
+        if self.pose_mode == 'none':
+            return None
+        return PoseEstimator(num_workers=self.pose_workers, policy=self.pose_policy, mode=self.pose_mode,
+                             static_image_mode=static_image_mode)
+    
+    def close(self):
+        """Release pose thread pools and graphs (models are reloaded if used again)"""
+        with self._models_lock:
+            pose_estimators = [self._pose_estimator] + list(self._worker_poses.values())
+            self._pose_estimator = None
+            self._worker_detectors = []
+            self._worker_poses = {}
+        for pose_estimator in pose_estimators:
+            if pose_estimator is not None:
+                pose_estimator.close()
+    
+    def _constructor_kwargs(self):
+        """Every constructor setting, so a copy of this tracker can be built in another process"""
+        return {
+            'pose_mode': self.pose_mode, 'pose_policy': self.pose_policy,
+            'pose_workers': self.pose_workers, 'play_area': self.play_area,
+            'model_size': self.model_size, 'backend': self.backend,
+            'input_size': self.input_size, 'refinement': self.refinement,
+            'profiler': self.profiler, 'reid': self.reid,
+            'conf_threshold': self.conf_threshold, 'inference_cache': self.inference_cache
+        }
+    
+    def worker_models(self, worker_id: int, static_pose: bool = False):
+        """
+        (detector, pose estimator) of a streaming inference worker; worker 0
+        shares this tracker's models, the others get their own instances
+        (neither YOLO nor MediaPipe graphs are thread-safe), loaded once
+        and reused for later videos. Safe to call from the worker threads.
+        
+        With `static_pose` a 'frame'-mode worker gets a static-image pose
+        graph: a video-mode graph fed only some of the frames, in scheduling
+        order, would smooth poses differently from run to run.
+        """
+        static_pose = static_pose and self.pose_mode == 'frame'
+        with self._models_lock:
+            if worker_id == 0:
+                detector = self.detector
+            else:
+                while len(self._worker_detectors) < worker_id:
+                    self._worker_detectors.append(self._make_detector())
+                detector = self._worker_detectors[worker_id - 1]
+            
+            if worker_id == 0 and not static_pose:
+                return detector, self.pose_estimator
+            key = (worker_id, static_pose)
+            if key not in self._worker_poses:
+                self._worker_poses[key] = self._make_pose_estimator(static_image_mode=static_pose)
+            return detector, self._worker_poses[key]
+    
+    def _cache_key(self):
+        """
+        Settings that determine the detector and pose outputs, or None when
+        those also depend on earlier frames (adaptive input size, automatic
+        play area) and so cannot be cached per frame
+        """
+        if self.input_size is not None or (self.play_area is not None and self.play_area.static_polygon is None):
+            return None
+        key = {'model': self.model_size, 'backend': self._backend_name,
+               'conf_threshold': self.conf_threshold, 'pose_mode': self.pose_mode}
+        if self.play_area is not None:
+            key['play_area'] = self.play_area.static_polygon.tolist()
+        if self.refinement is not None:
+            key['refinement'] = [self.refinement.low_imgsz, self.refinement.tile_size,
+                                 self.refinement.overlap, self.refinement.small_height,
+                                 self.refinement.iou_threshold]
+        if self.pose_mode == 'crops':
+            key['pose_policy'] = vars(self.pose_policy or PosePolicy())
+        return key
+    
+    def open_cache(self, video_path: str):
+        """Start looking up (and storing) this video's frames in the inference cache"""
+        self._cached_video = None
+        if self.inference_cache is None:
+            return
+        key = self._cache_key()
+        if key is None:
+            print("⚠ Inference cache skipped: adaptive input size or automatic play area")
+            return
+        self._cached_video = self.inference_cache.open(video_path, key)
+        print(f"✓ Inference cache: {len(self._cached_video)} frames of "
+              f"{os.path.basename(video_path)} cached")
+    
+    def close_cache(self):
+        """Write pending frames to the inference cache"""
+        if self._cached_video is not None:
+            self._cached_video.close()
+    
+    def process_video(self, video_path: str, output_path: str = None, max_frames: int = 100,
+                      batch_size: int = 1, results_dir: str = None, detect_stride: int = 1,
+                      propagation: str = 'flow', threaded_io: bool = False, encoder: str = 'opencv',
+                      render: bool = True, trace_path: str = None):
         """
         Process video with all components
         
@@ -31,108 +267,417 @@ class SportsPlayerTracker:
             video_path: Path to input video file
             output_path: Path to save output video (optional)
             max_frames: Maximum number of frames to process
+            batch_size: Number of frames sent through the detector per model call
+            results_dir: Stream per-frame results to columnar chunks in this
+                directory instead of keeping them in memory; a ResultsReader
+                over them is returned
+            detect_stride: Run the detector on every Nth frame (keyframes) and
+                propagate tracks in between; detection is re-triggered early
+                on scene cuts or when tracks become uncertain
+            propagation: 'flow' (Lucas-Kanade on track boxes) or 'kalman'
+                (motion prediction only) for frames between keyframes
+            threaded_io: Decode into a ring of preallocated buffers and encode
+                on background threads; frames are annotated in place
+            encoder: 'opencv' (mp4v) or 'ffmpeg' (H.264 through an ffmpeg pipe)
+            render: Draw and write the annotated video. With render=False (or no
+                output_path) the run is analytics-only: no drawing and no
+                writer; use utils.render.render_results to render it later
+            trace_path: Write the run's profiler spans to this Chrome-trace
+                JSON file (open in chrome://tracing or Perfetto)
         """
+        if detect_stride > 1 and batch_size > 1:
+            raise ValueError("detect_stride and batch_size cannot both be greater than 1")
+        if propagation not in ('flow', 'kalman'):
+            raise ValueError(f"Unknown propagation: {propagation}")
+        
         # VIDEO PATH USAGE: video_path should be like "data/videos/sports_video_1.mp4"
-        cap = cv2.VideoCapture(video_path)
+        self.reset()
+        batch_size = max(1, batch_size)
+        if threaded_io:
+            # The ring must hold a full detector batch plus frames still being encoded
+            cap = ThreadedVideoReader(video_path, ring_size=batch_size + 8, profiler=self.profiler)
+        else:
+            cap = VideoSource(video_path, profiler=self.profiler)
         
         if not cap.isOpened():
             print(f"❌ Error: Could not open video file {video_path}")
             return []
         
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        
-        if output_path:
-            # Create outputs directory if it doesn't exist
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-        
+        render = render and bool(output_path)
+        out = None
         frame_results = []
         frame_count = 0
+        results_writer = ResultsWriter(results_dir) if results_dir else None
+        keyframes = KeyframeScheduler(detect_stride) if detect_stride > 1 else None
+        flow = OpticalFlowPropagator() if propagation == 'flow' else None
         
         print(f"Processing video: {os.path.basename(video_path)}")
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret or frame_count >= max_frames:
-                break
-            
-            frame_count += 1
-            if frame_count % 10 == 0:
-                print(f"  Frame {frame_count}")
-            
-            # Player Detection
-            start_time = time.time()
-            detections = self.detector.detect_players(frame)
-            det_time = time.time() - start_time
-            
-            # Pose Estimation
-            pose_time = 0
-            poses = []
-            if detections:
-                start_time = time.time()
-                poses = self.pose_estimator.process_frame(frame)
-                pose_time = time.time() - start_time
-            
-            # Tracking
-            start_time = time.time()
-            tracks = self.tracker.update(detections)
-            track_time = time.time() - start_time
-            
-            # Update metrics
-            self.metrics['detection_times'].append(det_time)
-            self.metrics['pose_times'].append(pose_time)
-            self.metrics['tracking_times'].append(track_time)
-            self.metrics['frame_counts'] = frame_count
+        # Reader, video writer and cache are released even when a frame fails,
+        # since a long-lived worker (see service.worker_daemon) keeps going
+        try:
+            if render:
+                # Create outputs directory if it doesn't exist
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                out = VideoSink(output_path, cap.fps, (cap.width, cap.height),
+                                encoder=encoder, threaded=threaded_io, profiler=self.profiler)
+            self.open_cache(video_path)
             
-            # Annotate frame
-            annotated_frame = self.annotate_frame(frame, detections, poses, tracks)
-            
-            if output_path:
-                out.write(annotated_frame)
-            
-            # Store results
-            frame_results.append({
-                'frame_number': frame_count,
-                'detections': detections,
-                'poses': [self._serialize_pose(pose) for pose in poses],
-                'tracks': tracks
-            })
-        
-        cap.release()
-        if output_path:
-            out.release()
+            run_start = time.perf_counter()
+            while frame_count < max_frames:
+                frames, releases = [], []
+                while len(frames) < min(batch_size, max_frames - frame_count):
+                    frame, release = cap.read()
+                    if frame is None:
+                        break
+                    frames.append(frame)
+                    releases.append(release)
+                
+                if not frames:
+                    break
+                
+                # Player Detection (one model call for the whole batch)
+                batch_detections = [None] * len(frames)
+                batch_det_time = None
+                # Frames already in the inference cache are left out of the batch
+                uncached = [i for i in range(len(frames))
+                            if self._cached_video is None or frame_count + i + 1 not in self._cached_video]
+                if batch_size > 1 and uncached:
+                    start_time = time.perf_counter()
+                    batch = self.detector.detect_batch([frames[i] for i in uncached])
+                    batch_det_time = (time.perf_counter() - start_time) / len(uncached)
+                    for i, (boxes, confidences) in zip(uncached, batch):
+                        batch_detections[i] = PlayerDetector.to_detections(boxes, confidences)
+                
+                for i, (frame, release, detections) in enumerate(zip(frames, releases, batch_detections)):
+                    frame_count += 1
+                    if frame_count % 10 == 0:
+                        print(f"  Frame {frame_count}")
+                    
+                    if keyframes is not None:
+                        inference = self._keyframe_inference(frame, keyframes, flow, frame_count)
+                    else:
+                        inference = self._infer(frame, detections, batch_det_time, frame_number=frame_count)
+                    if batch_size > 1 and uncached and i == uncached[0]:
+                        # The batched detector call is counted on the first frame of its batch
+                        inference['model_calls'] += 1
+                    frame_result, annotated_frame = self._finish_frame(
+                        frame, frame_count, inference, results_writer, render
+                    )
+                    
+                    # The frame buffer goes back to the reader once it has been encoded
+                    if out is not None:
+                        out.write(annotated_frame, release)
+                    else:
+                        release()
+                    
+                    # Store results
+                    if results_writer is None:
+                        frame_results.append(frame_result)
+        finally:
+            cap.release()
+            if out is not None:
+                out.release()
+            self.close_cache()
+        # Decode through encode, so fps reflects the whole per-frame budget
+        self.metrics['wall_time'] = time.perf_counter() - run_start
+        if trace_path:
+            self.profiler.export_chrome_trace(trace_path)
+        
+        if keyframes is not None:
+            self.keyframe_stats['retrigger_reasons'] = dict(keyframes.reasons)
         
         print(f"✓ Processed {frame_count} frames from {os.path.basename(video_path)}")
+        if results_writer is not None:
+            results_writer.close()
+            return ResultsReader(results_dir)
         return frame_results
     
-    def _serialize_pose(self, pose):
+    def process_video_streaming(self, video_path: str, output_path: str = None, max_frames: int = 100,
+                                num_workers: int = 2, decode_queue_size: int = 8,
+                                result_queue_size: int = 8, encode_queue_size: int = 8,
+                                results_dir: str = None, trace_path: str = None):
+        """
+        Process video with the multi-threaded streaming engine
+        
+        Produces the same detections and tracks as process_video, with
+        decode, inference, tracking and encode overlapped. With several
+        workers in 'frame' pose mode each frame's pose is estimated on its
+        own (static-image graphs), so poses are reproducible but can differ
+        slightly from process_video's video-mode pose tracking. Per-stage
+        utilization of the last run is stored in self.engine_stats.
+        
+        Options that adapt detection to earlier frames (input_size,
+        refinement, an automatic play_area) are rejected: workers infer out
+        of frame order, so their decisions would depend on thread scheduling.
+        
+        Args:
+            num_workers: Inference worker threads (each loads its own models)
+            decode_queue_size: Max decoded frames waiting for inference
+            result_queue_size: Max inferred frames waiting for tracking
+            encode_queue_size: Max annotated frames waiting for the encoder
+            results_dir: Stream results to disk as in process_video
+            trace_path: Chrome-trace export as in process_video
+        """
+        if (self.input_size is not None or self.refinement is not None or
+                (self.play_area is not None and self.play_area.static_polygon is None)):
+            raise ValueError("input_size, refinement and an automatic play_area depend on frame "
+                             "order and cannot be used with the streaming engine")
+        self.reset()
+        engine = StreamingEngine(self, num_workers=num_workers,
+                                 decode_queue_size=decode_queue_size,
+                                 result_queue_size=result_queue_size,
+                                 encode_queue_size=encode_queue_size)
+        results_writer = ResultsWriter(results_dir) if results_dir else None
+        self.open_cache(video_path)
+        try:
+            frame_results = engine.run(video_path, output_path, max_frames, results_writer)
+        finally:
+            self.close_cache()
+        self.engine_stats = engine.stats
+        self.metrics['wall_time'] = engine.stats.get('wall_time', 0.0)
+        if trace_path:
+            self.profiler.export_chrome_trace(trace_path)
+        if results_writer is not None:
+            results_writer.close()
+            return ResultsReader(results_dir)
+        return frame_results
+    
+    def process_video_chunked(self, video_path: str, work_dir: str, max_frames: int = None,
+                              chunk_frames: int = 1800, overlap: int = 15,
+                              checkpoint_every: int = 300, workers: int = 1,
+                              pipeline_factory=None):
+        """
+        Process a long video in resumable, optionally parallel chunks
+        
+        Results stream to disk (analytics only, no annotated video) and a
+        ResultsReader over the stitched results in <work_dir>/merged is
+        returned. Rerunning with the same work_dir resumes an interrupted
+        job. self.chunk_metrics holds the combined performance metrics.
+        
+        Args:
+            work_dir: Checkpoints and per-chunk results (see ChunkedProcessor)
+            chunk_frames: Frames per chunk
+            overlap: Frames shared by consecutive chunks for ID stitching
+            checkpoint_every: Frames between checkpoints within a chunk
+            workers: Chunks processed in parallel (spawned processes)
+            pipeline_factory: Picklable callable building each worker's
+                pipeline; defaults to a copy of this tracker's settings
+        """
+        if workers > 1 and pipeline_factory is None:
+            pipeline_factory = functools.partial(SportsPlayerTracker, **self._constructor_kwargs())
+        processor = ChunkedProcessor(work_dir, chunk_frames=chunk_frames, overlap=overlap,
+                                     checkpoint_every=checkpoint_every)
+        results, self.chunk_metrics = processor.run(self, video_path, max_frames, workers,
+                                                    pipeline_factory)
+        print(f"✓ Processed {len(results)} frames from {os.path.basename(video_path)} "
+              f"({self.chunk_metrics['chunks']} chunks)")
+        return results
+    
+    def process_live(self, source: str, budget_ms: float = 100.0, max_frames: int = None,
+                     output=None, realtime: bool = None, budget: LatencyBudget = None):
+        """
+        Process a camera, RTSP URL, pipe or file in real time
+        
+        Stale frames are dropped and work is shed (pose, detector input
+        size, detection stride) to stay within the latency budget; tracks
+        stream out as JSON lines (see LiveRunner). Files are replayed at
+        their native frame rate unless realtime=False. Stats of the run are
+        stored in self.live_stats and returned.
+        
+        Args:
+            source: Camera index ('0'), stream URL, named pipe or video file
+            budget_ms: Per-frame latency budget, capture to output
+            max_frames: Stop after this many processed frames (default: until the source ends)
+            output: Text stream for the JSON lines (default stdout)
+            realtime: Pace reads at the source frame rate (default: files only)
+            budget: Custom degradation ladder (overrides budget_ms)
+        """
+        self.reset()
+        runner = LiveRunner(self, budget or LatencyBudget(budget_ms), output=output)
+        self.live_stats = runner.run(source, max_frames, realtime)
+        self.metrics['wall_time'] = self.live_stats.get('wall_time', 0.0)
+        return self.live_stats
+    
+    def _infer(self, frame, detections=None, det_time=None, detector=None, pose_estimator=None,
+               frame_number=None, skip_pose=False):
+        """
+        Detection (unless precomputed) and pose for one frame, independent of other frames
+        
+        With an open inference cache and a `frame_number`, a cached frame
+        returns its stored outputs without touching the models, and a
+        computed one is stored. `skip_pose` sheds pose estimation under load.
+        """
+        cached_video = self._cached_video if frame_number is not None and not skip_pose else None
+        if cached_video is not None:
+            cached = cached_video.get(frame_number)
+            if cached is not None:
+                return {'detections': cached[0], 'poses': cached[1], 'det_time': 0,
+                        'pose_time': 0, 'model_calls': 0, 'cached': True}
+        
+        detector = detector or self.detector
+        pose_estimator = None if skip_pose else pose_estimator or self.pose_estimator
+        calls_before = self._model_calls(detector, pose_estimator)
+        
+        # Player Detection
+        if detections is None:
+            start_time = time.perf_counter()
+            detections = detector.detect_players(frame)
+            det_time = time.perf_counter() - start_time
+        
+        # Pose Estimation
+        pose_time = 0
+        poses = []
+        if detections and pose_estimator is not None:
+            start_time = time.perf_counter()
+            with self.profiler.span('pose'):
+                if self.pose_mode == 'crops':
+                    boxes = np.array([d['bbox'] for d in detections], dtype=np.float32)
+                    confidences = np.array([d['confidence'] for d in detections], dtype=np.float32)
+                    poses = pose_estimator.process_crops(frame, boxes, confidences)
+                else:
+                    poses = pose_estimator.process_frame(frame)
+            pose_time = time.perf_counter() - start_time
+        
+        if self.startup_timings['warmup_time'] is None:
+            # No explicit warmup(): the first frame's inference is the warm-up cost
+            self.startup_timings['warmup_time'] = det_time + pose_time
+        
+        if cached_video is not None:
+            cached_video.put(frame_number, detections, poses)
+        
         return {
+            'detections': detections,
+            'poses': poses,
+            'det_time': det_time,
+            'pose_time': pose_time,
+            'model_calls': self._model_calls(detector, pose_estimator) - calls_before
+        }
+    
+    @staticmethod
+    def _model_calls(detector, pose_estimator):
+        return detector.inference_count + (pose_estimator.inference_count if pose_estimator else 0)
+    
+    def _keyframe_inference(self, frame, keyframes, flow=None, frame_number=None, skip_pose=False):
+        """Full inference on keyframes; on other frames only what track propagation needs"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        live_indices, live_boxes = self.tracker.live_track_boxes()
+        
+        if keyframes.should_detect(gray, self.tracker.position_uncertainty(live_indices)):
+            inference = self._infer(frame, frame_number=frame_number, skip_pose=skip_pose)
+        else:
+            inference = {'detections': [], 'poses': [], 'det_time': 0, 'pose_time': 0,
+                         'model_calls': 0, 'keyframe': False}
+            if flow is not None and keyframes.prev_gray is not None and len(live_boxes):
+                start_time = time.perf_counter()
+                with self.profiler.span('flow'):
+                    new_boxes, ok = flow.propagate(keyframes.prev_gray, gray, live_boxes)
+                keyframes.flow_ratio = float(ok.mean())
+                inference['flow'] = (live_indices[ok], new_boxes[ok])
+                self.keyframe_stats['flow_time'].update(time.perf_counter() - start_time)
+        
+        keyframes.prev_gray = gray
+        return inference
+    
+    def _finish_frame(self, frame, frame_count, inference, results_writer=None, render=True,
+                      frame_number=None):
+        """
+        Tracking, metrics and annotation for one frame; must run in frame order
+        
+        With a results_writer the frame is appended to disk and the returned
+        frame_result is None. Without render the returned frame is None.
+        `frame_number` (1-based position in the video) defaults to frame_count,
+        the number of frames processed so far in this run.
+        """
+        frame_number = frame_count if frame_number is None else frame_number
+        detections = inference['detections']
+        poses = inference['poses']
+        
+        # Tracking (non-keyframes only propagate existing tracks)
+        keyframe = inference.get('keyframe', True)
+        start_time = time.perf_counter()
+        with self.profiler.span('track', frame_count):
+            if keyframe:
+                tracks = self.tracker.update(detections, frame)
+            else:
+                tracks = self.tracker.propagate(*inference.get('flow', (None, None)))
+        track_time = time.perf_counter() - start_time
+        
+        if keyframe:
+            self.keyframe_stats['keyframes'] += 1
+            if self.tracker.last_match_iou is not None:
+                self.keyframe_stats['match_iou'].update(self.tracker.last_match_iou)
+        
+        if self.pose_mode == 'crops':
+            self._attach_poses(poses, tracks)
+        
+        # Auto-derived play area: learn it from the first frames' tracks
+        if self.play_area is not None and not self.play_area.ready:
+            self.play_area.observe(tracks)
+        
+        # Update metrics
+        self.metrics['detection_times'].update(inference['det_time'])
+        self.metrics['pose_times'].update(inference['pose_time'])
+        self.metrics['tracking_times'].update(track_time)
+        self.metrics['model_calls'].update(inference['model_calls'])
+        self.metrics['frame_counts'] = frame_count
+        self.results_stats.update(detections, tracks, keyframe)
+        self.profiler.snapshot_memory(frame_count)
+        
+        # Annotate frame (in place: the decoded frame is not needed afterwards)
+        annotated_frame = None
+        if render:
+            with self.profiler.span('draw', frame_count):
+                annotated_frame = self.annotate_frame(frame, detections, poses, tracks, inplace=True)
+        
+        if results_writer is not None:
+            results_writer.append(frame_number, detections, poses, tracks, keyframe)
+            return None, annotated_frame
+        
+        frame_result = {
+            'frame_number': frame_number,
+            'keyframe': keyframe,
+            'detections': detections,
+            'poses': [self._serialize_pose(pose) for pose in poses],
+            'tracks': tracks
+        }
+        return frame_result, annotated_frame
+    
+    def _attach_poses(self, poses, tracks):
+        """Link each crop pose to the track that matched its detection"""
+        track_ids = {t['detection_index']: t['track_id'] for t in tracks}
+        for pose in poses:
+            pose['track_id'] = track_ids.get(pose['detection_index'])
+    
+    def _serialize_pose(self, pose):
+        serialized = {
             'keypoints': pose['keypoints'].tolist(),
             'scores': pose['scores'].tolist()
         }
+        for key in ('bbox', 'detection_index', 'track_id'):
+            if key in pose:
+                serialized[key] = pose[key]
+        return serialized
     
-    def annotate_frame(self, frame, detections, poses, tracks):
-        annotated_frame = frame.copy()
+    def annotate_frame(self, frame, detections, poses, tracks, inplace=False):
+        annotated_frame = frame if inplace else frame.copy()
         
         # Draw detections (green)
         for detection in detections:
             x1, y1, x2, y2 = detection['bbox']
             cv2.rectangle(annotated_frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
         
-        # Draw poses
-        annotated_frame = self.pose_estimator.draw_poses(annotated_frame, poses)
+        # Draw poses (rendered from stored keypoints, no extra inference)
+        if poses:
+            annotated_frame = draw_pose_skeletons(annotated_frame, poses)
         
         # Draw tracks (colored by ID)
-        annotated_frame = self.tracker.draw_tracks(annotated_frame, tracks)
+        annotated_frame = self.tracker.draw_tracks(annotated_frame, tracks, inplace=True)
         
         # Add performance info
-        if len(self.metrics['detection_times']) > 0:
-            avg_det_time = np.mean(self.metrics['detection_times'][-10:]) * 1000
-            avg_pose_time = np.mean(self.metrics['pose_times'][-10:]) * 1000
-            avg_track_time = np.mean(self.metrics['tracking_times'][-10:]) * 1000
+        if self.metrics['detection_times'].stats.count > 0:
+            avg_det_time = self.metrics['detection_times'].recent.mean * 1000
+            avg_pose_time = self.metrics['pose_times'].recent.mean * 1000
+            avg_track_time = self.metrics['tracking_times'].recent.mean * 1000
             
             info_text = [
                 f"Detection: {avg_det_time:.1f}ms",
@@ -148,10 +693,51 @@ class SportsPlayerTracker:
         return annotated_frame
     
     def calculate_performance_metrics(self):
+        detection = self.metrics['detection_times'].stats
+        wall_time = self.metrics['wall_time']
         return {
-            'average_detection_time': np.mean(self.metrics['detection_times']),
-            'average_pose_time': np.mean(self.metrics['pose_times']),
-            'average_tracking_time': np.mean(self.metrics['tracking_times']),
+            'average_detection_time': detection.mean,
+            'average_pose_time': self.metrics['pose_times'].stats.mean,
+            'average_tracking_time': self.metrics['tracking_times'].stats.mean,
+            'average_model_calls_per_frame': self.metrics['model_calls'].stats.mean,
+            'detection_time_std': detection.std,
             'total_frames': self.metrics['frame_counts'],
-            'fps': self.metrics['frame_counts'] / sum(self.metrics['detection_times']) if self.metrics['detection_times'] else 0
-        }
\ No newline at end of file
+            'fps': self.metrics['frame_counts'] / wall_time if wall_time > 0 else 0,
+            'detection_fps': self.metrics['frame_counts'] / detection.total if detection.total > 0 else 0,
+            'wall_time': wall_time,
+            'profile': self.profiler.summary(),
+            'keyframes': self._keyframe_metrics(),
+            'input_size': self._input_size_metrics(),
+            'reid': self.reid.summary() if self.reid is not None else {},
+            'inference_cache': self._cached_video.summary() if self._cached_video is not None else {},
+            'startup': dict(self.startup_timings)
+        }
+    
+    def _keyframe_metrics(self):
+        """
+        Speed/accuracy tradeoff of detect_stride: detector calls saved versus
+        how well propagated tracks still overlapped detections at keyframes
+        """
+        total_frames = self.metrics['frame_counts']
+        keyframes = self.keyframe_stats['keyframes']
+        return {
+            'keyframes': keyframes,
+            'keyframe_ratio': keyframes / total_frames if total_frames else 0,
+            'detector_calls_saved': total_frames - keyframes,
+            'retrigger_reasons': self.keyframe_stats['retrigger_reasons'],
+            'average_keyframe_match_iou': self.keyframe_stats['match_iou'].mean,
+            'average_flow_time': self.keyframe_stats['flow_time'].stats.mean
+        }
+    
+    def _input_size_metrics(self):
+        """Detector input sizes chosen for the last video and their latency"""
+        metrics = {}
+        if self.input_size is not None:
+            metrics.update(self.input_size.stats())
+        if self.refinement is not None:
+            metrics['refinement'] = self.refinement.stats()
+        return metrics
+    
+    def results_summary(self):
+        """Report aggregates for the last video, maintained per frame"""
+        return self.results_stats.summary()
\ No newline at end of file
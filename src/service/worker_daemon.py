@@ -0,0 +1,143 @@
+import json
+import os
+import socket
+import time
+import traceback
+from typing import Dict, Optional
+
+# Job options a client may send, with their JSON types; None means "use the
+# process_video default". Paths are checked separately (see WorkerDaemon).
+JOB_OPTIONS = {
+    'output_path': str, 'max_frames': int, 'batch_size': int, 'results_dir': str,
+    'detect_stride': int, 'propagation': str, 'threaded_io': bool, 'encoder': str,
+    'render': bool, 'trace_path': str
+}
+OUTPUT_PATH_OPTIONS = ('output_path', 'results_dir', 'trace_path')
+
+def _to_json(value):
+    # NumPy arrays and scalars in metrics/summaries
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+def _send(conn, message: Dict):
+    conn.sendall((json.dumps(message, default=_to_json) + '\n').encode())
+
+def _receive(conn) -> Dict:
+    buffer = b''
+    while not buffer.endswith(b'\n'):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        buffer += chunk
+    return json.loads(buffer.decode()) if buffer.strip() else {}
+
+def _invalid(message: str, fields) -> Dict:
+    return {'status': 'error', 'error': message, 'invalid_fields': list(fields)}
+
+class WorkerDaemon:
+    def __init__(self, tracker, socket_path: str = '/tmp/player-tracking.sock',
+                 output_root: str = 'outputs'):
+        """
+        Long-lived local worker that keeps a SportsPlayerTracker's models warm
+        
+        Listens on a Unix socket for newline-delimited JSON requests:
+            {"video_path": ..., "output_path": ..., "max_frames": ..., ...}
+                -> processes the video (options in JOB_OPTIONS are passed to
+                   process_video; anything else is rejected)
+            {"command": "ping"} / {"command": "shutdown"}
+        Jobs are handled one at a time since they share one set of models.
+        
+        Args:
+            tracker: SportsPlayerTracker whose models are kept loaded
+            socket_path: Unix socket to listen on
+            output_root: Directory that output_path, results_dir and
+                trace_path must lie in
+        """
+        self.tracker = tracker
+        self.socket_path = socket_path
+        self.output_root = os.path.realpath(output_root)
+        self.jobs_completed = 0
+    
+    def serve_forever(self):
+        timings = self.tracker.warmup()
+        print(f"✓ Models warm (import {timings['import_time']:.2f}s, "
+              f"load {timings['model_load_time']:.2f}s, warm-up {timings['warmup_time']:.2f}s)")
+        
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen()
+        print(f"Worker listening on {self.socket_path}")
+        
+        try:
+            while True:
+                conn, _ = server.accept()
+                with conn:
+                    request = _receive(conn)
+                    if request.get('command') == 'shutdown':
+                        _send(conn, {'status': 'ok'})
+                        break
+                    _send(conn, self.handle(request))
+        finally:
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+    
+    def handle(self, request: Dict) -> Dict:
+        if request.get('command') == 'ping':
+            return {'status': 'ok', 'jobs_completed': self.jobs_completed,
+                    'startup': self.tracker.startup_timings}
+        
+        job = dict(request)
+        video_path = job.pop('video_path', None)
+        error = self._check_job(video_path, job)
+        if error is not None:
+            return error
+        job = {key: value for key, value in job.items() if value is not None}
+        
+        start_time = time.perf_counter()
+        try:
+            results = self.tracker.process_video(video_path, **job)
+        except Exception as e:
+            traceback.print_exc()
+            return {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+        
+        self.jobs_completed += 1
+        return {
+            'status': 'ok',
+            'video_path': video_path,
+            'frame_count': len(results),
+            'job_time': time.perf_counter() - start_time,
+            'performance_metrics': self.tracker.calculate_performance_metrics(),
+            'summary': self.tracker.results_summary()
+        }
+    
+    def _check_job(self, video_path, job: Dict) -> Optional[Dict]:
+        """Error reply for a job with unknown options, wrong types or disallowed paths"""
+        if not isinstance(video_path, str) or not video_path:
+            return _invalid("missing 'video_path'", ['video_path'])
+        if not os.path.isfile(video_path):
+            return _invalid(f"video not found: {video_path}", ['video_path'])
+        
+        unknown = sorted(key for key in job if key not in JOB_OPTIONS)
+        if unknown:
+            return _invalid(f"unsupported option(s): {', '.join(unknown)}", unknown)
+        wrong_type = sorted(key for key, value in job.items()
+                            if value is not None and type(value) is not JOB_OPTIONS[key])
+        if wrong_type:
+            return _invalid(f"wrong type for option(s): {', '.join(wrong_type)}", wrong_type)
+        outside = sorted(key for key in OUTPUT_PATH_OPTIONS if job.get(key) is not None and
+                         os.path.commonpath([self.output_root, os.path.realpath(job[key])]) != self.output_root)
+        if outside:
+            return _invalid(f"output paths must be inside {self.output_root}", outside)
+        return None
+
+def submit_job(socket_path: str, request: Dict, timeout: float = None) -> Dict:
+    """Send one request to a running WorkerDaemon and wait for its reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(socket_path)
+        _send(conn, request)
+        return _receive(conn)
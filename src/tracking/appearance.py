@@ -0,0 +1,199 @@
+import cv2
+import numpy as np
+from collections import OrderedDict, deque
+from scipy.optimize import linear_sum_assignment
+from typing import List, Dict, Optional
+
+def color_histogram_embeddings(frame: np.ndarray, boxes: np.ndarray, bins=(16, 4)) -> np.ndarray:
+    """
+    Compact appearance embedding per box: a hue/saturation histogram of the torso
+    
+    The torso (central 60% of the width, 15-60% of the height) carries the
+    kit colours and avoids most background and legs. Histograms are
+    square-rooted and L2-normalised, so a dot product between two
+    embeddings is their Bhattacharyya coefficient (1 = identical).
+    """
+    h, w = frame.shape[:2]
+    embeddings = np.zeros((len(boxes), bins[0] * bins[1]), dtype=np.float32)
+    for i, (x1, y1, x2, y2) in enumerate(np.asarray(boxes, dtype=np.float32).reshape(-1, 4)):
+        bw, bh = x2 - x1, y2 - y1
+        cx1, cx2 = int(max(0, x1 + 0.2 * bw)), int(min(w, x2 - 0.2 * bw))
+        cy1, cy2 = int(max(0, y1 + 0.15 * bh)), int(min(h, y1 + 0.6 * bh))
+        if cx2 <= cx1 or cy2 <= cy1:
+            continue
+        hsv = cv2.cvtColor(frame[cy1:cy2, cx1:cx2], cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, list(bins), [0, 180, 0, 256]).ravel()
+        hist = np.sqrt(hist)
+        norm = np.linalg.norm(hist)
+        if norm > 0:
+            embeddings[i] = hist / norm
+    return embeddings
+
+class AppearanceReID:
+    def __init__(self, ambiguity_margin=0.2, appearance_weight=0.5, reid_threshold=0.85,
+                 samples_per_track=8, sample_interval=10, max_lost=32, max_lost_age=300,
+                 max_jump=2.0, bins=(16, 4)):
+        """
+        Appearance cue for PlayerTracker association and ID recovery
+        
+        Embeddings are only computed where IoU alone is not enough:
+        detections competing for the same track (or tracks for the same
+        detection), new detections while lost tracks are remembered, and an
+        occasional sample of each isolated track to keep its gallery fresh.
+        
+        Args:
+            ambiguity_margin: A track/detection pair is ambiguous when the
+                runner-up IoU is above the tracker threshold and within this
+                margin of the best one
+            appearance_weight: Blend of appearance similarity into the
+                association score of ambiguous pairs (0 = IoU only)
+            reid_threshold: Minimum similarity for a new detection to take
+                over the ID of a lost track
+            samples_per_track: Embeddings kept per track gallery
+            sample_interval: Frames between gallery samples of a clean track
+            max_lost: Lost-track galleries kept, least recently seen evicted first
+            max_lost_age: Frames after which a lost track can no longer be recovered
+            max_jump: How far (in box heights) from its last box a live but
+                unmatched track may be recovered, so look-alike teammates
+                across the pitch do not swap IDs
+            bins: Hue/saturation histogram bins of the embedding
+        """
+        self.ambiguity_margin = ambiguity_margin
+        self.appearance_weight = appearance_weight
+        self.reid_threshold = reid_threshold
+        self.samples_per_track = samples_per_track
+        self.sample_interval = sample_interval
+        self.max_lost = max_lost
+        self.max_lost_age = max_lost_age
+        self.max_jump = max_jump
+        self.bins = bins
+        self.reset()
+    
+    def reset(self):
+        """Forget all galleries (new video)"""
+        self.galleries = {}
+        self.last_sampled = {}
+        self.lost = OrderedDict()
+        self.stats = {'embeddings': 0, 'ambiguous_frames': 0, 'recoveries': 0, 'evictions': 0}
+        self._frame = None
+        self._boxes = None
+        self._cache = {}
+    
+    def __getstate__(self):
+        # Checkpoints keep the galleries, not the last frame
+        state = dict(self.__dict__)
+        state.update(_frame=None, _boxes=None, _cache={})
+        return state
+    
+    def begin_frame(self, frame: Optional[np.ndarray], det_boxes: np.ndarray):
+        """Set the frame whose detection crops may be embedded (at most once each)"""
+        self._frame = frame
+        self._boxes = det_boxes
+        self._cache = {}
+    
+    def _embeddings(self, det_indices) -> np.ndarray:
+        missing = [i for i in det_indices if i not in self._cache]
+        if missing:
+            computed = color_histogram_embeddings(self._frame, self._boxes[missing], self.bins)
+            self._cache.update(zip(missing, computed))
+            self.stats['embeddings'] += len(missing)
+        return np.array([self._cache[i] for i in det_indices], dtype=np.float32).reshape(
+            len(det_indices), -1)
+    
+    @staticmethod
+    def _similarity(gallery, embeddings: np.ndarray) -> np.ndarray:
+        # Best match against any stored sample of the track
+        return (np.asarray(gallery) @ embeddings.T).max(axis=0)
+    
+    def association_scores(self, iou: np.ndarray, track_ids: List[int], iou_threshold: float) -> np.ndarray:
+        """IoU matrix with appearance blended into ambiguous track/detection pairs"""
+        if self._frame is None or max(iou.shape) < 2:
+            return iou
+        candidates = iou >= iou_threshold
+        ambiguous = np.zeros_like(candidates)
+        for axis in (0, 1):
+            if iou.shape[axis] < 2:
+                continue
+            ranked = np.sort(np.where(candidates, iou, 0.0), axis=axis)
+            best = np.take(ranked, -1, axis=axis)
+            runner_up = np.take(ranked, -2, axis=axis)
+            close = (runner_up >= iou_threshold) & (best - runner_up < self.ambiguity_margin)
+            ambiguous |= candidates & np.expand_dims(close, axis)
+        if not ambiguous.any():
+            return iou
+        
+        self.stats['ambiguous_frames'] += 1
+        rows = [r for r in np.flatnonzero(ambiguous.any(axis=1)) if track_ids[r] in self.galleries]
+        cols = np.flatnonzero(ambiguous.any(axis=0))
+        if not rows:
+            return iou
+        embeddings = self._embeddings(cols.tolist())
+        scores = iou.copy()
+        for r in rows:
+            similarity = self._similarity(self.galleries[track_ids[r]], embeddings)
+            blend = (1 - self.appearance_weight) * iou[r, cols] + self.appearance_weight * similarity
+            scores[r, cols] = np.where(ambiguous[r, cols], blend, iou[r, cols])
+        return scores
+    
+    def observe(self, track_ids: List[int], det_indices: List[int], isolated: np.ndarray, frame_count: int):
+        """Add gallery samples for matched tracks (isolated ones only, to avoid occluded crops)"""
+        if self._frame is None:
+            return
+        due = [(track_id, det_idx) for track_id, det_idx, clean in zip(track_ids, det_indices, isolated)
+               if clean and frame_count - self.last_sampled.get(track_id, -self.sample_interval)
+               >= self.sample_interval]
+        if not due:
+            return
+        embeddings = self._embeddings([det_idx for _, det_idx in due])
+        for (track_id, _), embedding in zip(due, embeddings):
+            self.galleries.setdefault(track_id, deque(maxlen=self.samples_per_track)).append(embedding)
+            self.last_sampled[track_id] = frame_count
+    
+    def forget(self, track_id: int, frame_count: int):
+        """A track was deleted: keep its gallery in the lost LRU for later recovery"""
+        gallery = self.galleries.pop(track_id, None)
+        self.last_sampled.pop(track_id, None)
+        if gallery:
+            self.lost[track_id] = (gallery, frame_count)
+            while len(self.lost) > self.max_lost:
+                self.lost.popitem(last=False)
+                self.stats['evictions'] += 1
+    
+    def recover(self, det_indices: List[int], missing: Dict[int, np.ndarray], frame_count: int) -> List[Optional[int]]:
+        """
+        Track ID to reuse for each unmatched detection, or None
+        
+        Candidates are lost (deleted) tracks and `missing` ({track_id: last
+        box}), live tracks that went unmatched this frame, e.g. after an
+        occlusion moved the player away from their predicted box.
+        """
+        for track_id in [t for t, (_, lost_at) in self.lost.items()
+                         if frame_count - lost_at > self.max_lost_age]:
+            del self.lost[track_id]
+            self.stats['evictions'] += 1
+        recovered = [None] * len(det_indices)
+        candidates = [(t, self.galleries[t]) for t in missing if t in self.galleries]
+        candidates += [(t, gallery) for t, (gallery, _) in self.lost.items()]
+        if self._frame is None or not candidates or not det_indices:
+            return recovered
+        
+        embeddings = self._embeddings(list(det_indices))
+        similarity = np.stack([self._similarity(gallery, embeddings) for _, gallery in candidates])
+        centres = (self._boxes[det_indices, :2] + self._boxes[det_indices, 2:]) / 2
+        for r, (track_id, _) in enumerate(candidates):
+            if track_id in missing:
+                x1, y1, x2, y2 = missing[track_id]
+                jump = np.hypot(*(centres - [(x1 + x2) / 2, (y1 + y2) / 2]).T) / max(y2 - y1, 1.0)
+                similarity[r, jump > self.max_jump] = 0.0
+        rows, cols = linear_sum_assignment(-similarity)
+        for r, c in zip(rows, cols):
+            if similarity[r, c] >= self.reid_threshold:
+                track_id = candidates[r][0]
+                recovered[c] = track_id
+                if track_id in self.lost:
+                    self.galleries[track_id] = self.lost.pop(track_id)[0]
+                self.stats['recoveries'] += 1
+        return recovered
+    
+    def summary(self) -> Dict:
+        return dict(self.stats, active_galleries=len(self.galleries), lost_galleries=len(self.lost))
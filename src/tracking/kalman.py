@@ -0,0 +1,101 @@
+import numpy as np
+
+def xyxy_to_cxcywh(boxes: np.ndarray) -> np.ndarray:
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    wh = boxes[:, 2:] - boxes[:, :2]
+    return np.concatenate([boxes[:, :2] + wh / 2, wh], axis=1)
+
+def cxcywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    half = boxes[:, 2:] / 2
+    return np.concatenate([boxes[:, :2] - half, boxes[:, :2] + half], axis=1)
+
+class BatchKalmanFilter:
+    """
+    Constant-velocity Kalman filter for all tracks at once
+    
+    Each track's state is [cx, cy, w, h, vx, vy, vw, vh]. Means live in one
+    (N, 8) array and covariances in one (N, 8, 8) array, so predict and
+    update are a few broadcast NumPy operations regardless of track count.
+    Row i always belongs to the i-th track of the owning tracker.
+    """
+    
+    def __init__(self, std_position=1 / 20, std_velocity=1 / 160):
+        self.std_position = std_position
+        self.std_velocity = std_velocity
+        
+        self.F = np.eye(8)
+        self.F[:4, 4:] = np.eye(4)
+        
+        self.mean = np.zeros((0, 8))
+        self.covariance = np.zeros((0, 8, 8))
+    
+    def __len__(self):
+        return len(self.mean)
+    
+    def _scale(self, wh: np.ndarray) -> np.ndarray:
+        # Noise scales with box size: [w, h, w, h] per track
+        return np.concatenate([wh, wh], axis=1)
+    
+    def initiate(self, boxes: np.ndarray):
+        """Append new tracks from xyxy boxes"""
+        measurement = xyxy_to_cxcywh(boxes)
+        if len(measurement) == 0:
+            return
+        
+        scale = self._scale(measurement[:, 2:])
+        std = np.concatenate([2 * self.std_position * scale,
+                              10 * self.std_velocity * scale], axis=1)
+        
+        mean = np.concatenate([measurement, np.zeros_like(measurement)], axis=1)
+        covariance = np.zeros((len(mean), 8, 8))
+        covariance[:, np.arange(8), np.arange(8)] = std ** 2
+        
+        self.mean = np.concatenate([self.mean, mean])
+        self.covariance = np.concatenate([self.covariance, covariance])
+    
+    def predict(self):
+        """Advance every track by one frame"""
+        if len(self.mean) == 0:
+            return
+        
+        scale = self._scale(self.mean[:, 2:4])
+        std = np.concatenate([self.std_position * scale,
+                              self.std_velocity * scale], axis=1)
+        
+        self.mean = self.mean @ self.F.T
+        self.covariance = self.F @ self.covariance @ self.F.T
+        self.covariance[:, np.arange(8), np.arange(8)] += std ** 2
+        
+        # Keep boxes valid when a shrinking velocity overshoots
+        self.mean[:, 2:4] = np.maximum(self.mean[:, 2:4], 1.0)
+    
+    def update(self, indices: np.ndarray, boxes: np.ndarray):
+        """Correct the tracks at `indices` with their matched xyxy boxes"""
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) == 0:
+            return
+        
+        measurement = xyxy_to_cxcywh(boxes)
+        mean = self.mean[indices]
+        covariance = self.covariance[indices]
+        
+        r_std = self.std_position * self._scale(mean[:, 2:4])
+        innovation_cov = covariance[:, :4, :4].copy()
+        innovation_cov[:, np.arange(4), np.arange(4)] += r_std ** 2
+        
+        # K = P H^T S^-1, with H selecting the first four state entries
+        gain = covariance[:, :, :4] @ np.linalg.inv(innovation_cov)
+        innovation = measurement - mean[:, :4]
+        
+        self.mean[indices] = mean + (gain @ innovation[:, :, None])[:, :, 0]
+        self.covariance[indices] = covariance - gain @ innovation_cov @ gain.transpose(0, 2, 1)
+    
+    def keep(self, mask: np.ndarray):
+        """Drop the rows of deleted tracks"""
+        self.mean = self.mean[mask]
+        self.covariance = self.covariance[mask]
+    
+    def boxes(self) -> np.ndarray:
+        """Current state of every track as (N, 4) xyxy boxes"""
+        return cxcywh_to_xyxy(self.mean[:, :4])
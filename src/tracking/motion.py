@@ -0,0 +1,119 @@
+import cv2
+import numpy as np
+from typing import Tuple
+
+class OpticalFlowPropagator:
+    def __init__(self, grid_size=(3, 5), inner_fraction=0.6, min_points_ratio=0.5):
+        """
+        Moves track boxes between frames with sparse Lucas-Kanade flow
+        
+        Args:
+            grid_size: (columns, rows) of points sampled inside each box
+            inner_fraction: Sample only the central part of the box, which is
+                more likely to be on the player than on the background
+            min_points_ratio: Fraction of points that must be tracked for the
+                box to count as successfully propagated
+        """
+        self.grid_size = grid_size
+        self.inner_fraction = inner_fraction
+        self.min_points_ratio = min_points_ratio
+        self.lk_params = dict(winSize=(15, 15), maxLevel=2,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+    
+    def _sample_points(self, boxes: np.ndarray) -> np.ndarray:
+        # (N, P, 2) grid of points for every box at once
+        cols, rows = self.grid_size
+        u = np.linspace(0.5 - self.inner_fraction / 2, 0.5 + self.inner_fraction / 2, cols)
+        v = np.linspace(0.5 - self.inner_fraction / 2, 0.5 + self.inner_fraction / 2, rows)
+        grid = np.stack(np.meshgrid(u, v), axis=-1).reshape(-1, 2)
+        wh = boxes[:, 2:] - boxes[:, :2]
+        return boxes[:, None, :2] + grid[None] * wh[:, None]
+    
+    def propagate(self, prev_gray: np.ndarray, gray: np.ndarray,
+                  boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Shift each box by the median flow of its points
+        
+        Returns (new_boxes, ok) where ok marks boxes whose flow was reliable.
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if len(boxes) == 0:
+            return boxes, np.zeros(0, dtype=bool)
+        
+        points = self._sample_points(boxes).astype(np.float32)
+        num_boxes, points_per_box = points.shape[:2]
+        
+        # One LK call for the points of every box
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            prev_gray, gray, points.reshape(-1, 1, 2), None, **self.lk_params
+        )
+        status = status.reshape(num_boxes, points_per_box).astype(bool)
+        flow = (next_points.reshape(num_boxes, points_per_box, 2) - points)
+        
+        # Median over tracked points only; untracked points become NaN
+        flow = np.where(status[..., None], flow, np.nan)
+        ok = status.mean(axis=1) >= self.min_points_ratio
+        shift = np.nan_to_num(np.nanmedian(np.where(ok[:, None, None], flow, 0.0), axis=1))
+        
+        return boxes + np.tile(shift, 2), ok
+
+class SceneCutDetector:
+    def __init__(self, threshold=0.5, size=(64, 36), bins=32):
+        """
+        Flags hard cuts by comparing grayscale histograms of consecutive frames
+        
+        Args:
+            threshold: Histogram correlation below which a cut is reported
+            size: Frames are downscaled to this size before comparing
+        """
+        self.threshold = threshold
+        self.size = size
+        self.bins = bins
+        self.prev_hist = None
+    
+    def update(self, gray: np.ndarray) -> bool:
+        small = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA)
+        hist = cv2.calcHist([small], [0], None, [self.bins], [0, 256])
+        cv2.normalize(hist, hist)
+        
+        is_cut = (self.prev_hist is not None and
+                  cv2.compareHist(self.prev_hist, hist, cv2.HISTCMP_CORREL) < self.threshold)
+        self.prev_hist = hist
+        return bool(is_cut)
+
+class KeyframeScheduler:
+    def __init__(self, stride=1, max_uncertainty=0.25, min_flow_ratio=0.6, scene_cut_threshold=0.5):
+        """
+        Decides on which frames the full detector runs
+        
+        A keyframe is forced every `stride` frames, and earlier when a scene
+        cut is detected, the tracker's relative position uncertainty exceeds
+        `max_uncertainty`, or fewer than `min_flow_ratio` of the tracks could
+        be followed by optical flow on the previous frame.
+        """
+        self.stride = max(1, stride)
+        self.max_uncertainty = max_uncertainty
+        self.min_flow_ratio = min_flow_ratio
+        self.scene_cuts = SceneCutDetector(scene_cut_threshold)
+        self.frames_since_keyframe = 0
+        self.flow_ratio = 1.0
+        self.prev_gray = None
+        self.reasons = {'stride': 0, 'scene_cut': 0, 'low_confidence': 0}
+    
+    def should_detect(self, gray: np.ndarray, uncertainty: float) -> bool:
+        is_cut = self.scene_cuts.update(gray) if self.stride > 1 else False
+        
+        if self.frames_since_keyframe == 0 or self.frames_since_keyframe >= self.stride:
+            reason = 'stride'
+        elif is_cut:
+            reason = 'scene_cut'
+        elif uncertainty > self.max_uncertainty or self.flow_ratio < self.min_flow_ratio:
+            reason = 'low_confidence'
+        else:
+            self.frames_since_keyframe += 1
+            return False
+        
+        self.reasons[reason] += 1
+        self.frames_since_keyframe = 1
+        self.flow_ratio = 1.0
+        return True
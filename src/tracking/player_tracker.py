@@ -1,48 +1,226 @@
 # src/tracking/player_tracker.py
 import numpy as np
+from collections import deque
 from scipy.optimize import linear_sum_assignment
 from typing import List, Dict
 import cv2
+from tracking.appearance import AppearanceReID
+from tracking.kalman import BatchKalmanFilter
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between two sets of xyxy boxes, shape (len(a), len(b))"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    wh = np.clip(bottom_right - top_left, 0, None)
+    intersection = wh[..., 0] * wh[..., 1]
+    
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
 
 class Track:
-    def __init__(self, track_id, bbox):
+    def __init__(self, track_id, bbox, history_size=64, detection_index=None):
         self.track_id = track_id
         self.bbox = bbox
-        self.history = [bbox]
+        self.detection_index = detection_index
+        self.history = deque([bbox], maxlen=history_size)
+        self.hits = 1
+        self.age = 1
+        self.time_since_update = 0
+    
+    def update(self, bbox, detection_index=None):
+        self.bbox = bbox
+        self.detection_index = detection_index
+        self.history.append(bbox)
+        self.hits += 1
+        self.age += 1
+        self.time_since_update = 0
+    
+    def mark_missed(self, predicted_bbox):
+        self.bbox = predicted_bbox
+        self.age += 1
+        self.time_since_update += 1
         
 class PlayerTracker:
-    def __init__(self, iou_threshold=0.3):
+    def __init__(self, iou_threshold=0.3, max_age=30, min_hits=3, history_size=64,
+                 reid: AppearanceReID = None):
+        """
+        SORT-style tracker: Kalman prediction, IoU cost matrix + Hungarian assignment
+        
+        Args:
+            iou_threshold: Minimum IoU for a detection to continue a track
+            max_age: Frames a track survives without a matching detection
+            min_hits: Matches needed before a track is reported
+            history_size: Number of past boxes kept per track
+            reid: Optional appearance cue; needs the frame passed to update().
+                Breaks ambiguous IoU matches and gives returning players
+                their lost track ID back
+        """
         self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.history_size = history_size
+        self.reid = reid
         self.tracks = []
+        self.kf = BatchKalmanFilter()
         self.next_id = 1
+        self.frame_count = 0
+        self.last_match_iou = None
+    
+    def _associate(self, track_boxes: np.ndarray, det_boxes: np.ndarray):
+        """Match tracks to detections, returns (matches, unmatched_tracks, unmatched_dets)"""
+        num_tracks, num_dets = len(track_boxes), len(det_boxes)
+        self.last_match_iou = None
+        if num_tracks == 0 or num_dets == 0:
+            return (np.empty((0, 2), dtype=np.int64),
+                    np.arange(num_tracks), np.arange(num_dets))
+        
+        iou = iou_matrix(track_boxes, det_boxes)
+        scores = iou
+        if self.reid is not None:
+            scores = self.reid.association_scores(iou, [t.track_id for t in self.tracks],
+                                                  self.iou_threshold)
+        rows, cols = linear_sum_assignment(-scores)
+        valid = iou[rows, cols] >= self.iou_threshold
+        matches = np.stack([rows[valid], cols[valid]], axis=1)
+        # How well the predicted boxes lined up with the detections they matched
+        self.last_match_iou = float(iou[matches[:, 0], matches[:, 1]].mean()) if len(matches) else None
+        
+        track_matched = np.zeros(num_tracks, dtype=bool)
+        det_matched = np.zeros(num_dets, dtype=bool)
+        track_matched[matches[:, 0]] = True
+        det_matched[matches[:, 1]] = True
+        
+        return matches, np.flatnonzero(~track_matched), np.flatnonzero(~det_matched)
+    
+    def update(self, detections: List[Dict], frame: np.ndarray = None) -> List[Dict]:
+        """
+        Associate detections with existing tracks and return the active tracks
+        
+        `frame` is only needed for the appearance cue (reid).
+        """
+        self.frame_count += 1
+        
+        # Motion prediction for every track at once
+        self.kf.predict()
+        predicted_boxes = self.kf.boxes()
+        
+        det_boxes = np.array([d['bbox'] for d in detections], dtype=np.float32).reshape(-1, 4)
+        if self.reid is not None:
+            self.reid.begin_frame(frame, det_boxes)
+        matches, unmatched_tracks, unmatched_dets = self._associate(predicted_boxes, det_boxes)
+        
+        self.kf.update(matches[:, 0], det_boxes[matches[:, 1]])
+        for track_idx, det_idx in matches:
+            self.tracks[track_idx].update(detections[det_idx]['bbox'], int(det_idx))
+        for track_idx in unmatched_tracks:
+            self.tracks[track_idx].mark_missed(predicted_boxes[track_idx].tolist())
+        
+        recovered = [None] * len(unmatched_dets)
+        if self.reid is not None:
+            self._sample_appearance(matches, det_boxes)
+            missing = {self.tracks[i].track_id: self.tracks[i] for i in unmatched_tracks}
+            recovered = self.reid.recover(unmatched_dets.tolist(),
+                                          {track_id: t.bbox for track_id, t in missing.items()},
+                                          self.frame_count)
+        
+        # A recovered missing track restarts from the new box under its old ID
+        replaced = set()
+        self.kf.initiate(det_boxes[unmatched_dets])
+        for det_idx, track_id in zip(unmatched_dets, recovered):
+            track = Track(track_id or self.next_id, detections[det_idx]['bbox'],
+                          self.history_size, int(det_idx))
+            if track_id is None:
+                self.next_id += 1
+            else:
+                # A recognised returning player is reported straight away
+                track.hits = self.min_hits
+                if track_id in missing:
+                    replaced.add(id(missing[track_id]))
+            self.tracks.append(track)
+        
+        # Track deletion
+        alive = np.array([t.time_since_update <= self.max_age and id(t) not in replaced
+                          for t in self.tracks], dtype=bool)
+        if not alive.all():
+            if self.reid is not None:
+                for track, keep in zip(self.tracks, alive):
+                    if not keep and id(track) not in replaced:
+                        self.reid.forget(track.track_id, self.frame_count)
+            self.kf.keep(alive)
+            self.tracks = [t for t, keep in zip(self.tracks, alive) if keep]
+        
+        return [
+            {'track_id': t.track_id, 'bbox': t.bbox, 'detection_index': t.detection_index}
+            for t in self._reported_tracks()
+        ]
+    
+    def _sample_appearance(self, matches, det_boxes):
+        """Refresh galleries from matched detections that do not overlap any other detection"""
+        if len(matches) == 0:
+            return
+        overlap = iou_matrix(det_boxes, det_boxes)
+        np.fill_diagonal(overlap, 0.0)
+        isolated = overlap.max(axis=1) < 0.05
+        det_indices = matches[:, 1]
+        self.reid.observe([self.tracks[i].track_id for i in matches[:, 0]], det_indices.tolist(),
+                          isolated[det_indices], self.frame_count)
+    
+    def _reported_tracks(self):
+        return [
+            t for t in self.tracks
+            if t.time_since_update == 0
+            and (t.hits >= self.min_hits or self.frame_count <= self.min_hits)
+        ]
+    
+    def live_track_boxes(self):
+        """Indices and xyxy boxes of the tracks matched on the last detection frame"""
+        indices = np.array([i for i, t in enumerate(self.tracks) if t.time_since_update == 0],
+                           dtype=np.int64)
+        boxes = np.array([self.tracks[i].bbox for i in indices], dtype=np.float32).reshape(-1, 4)
+        return indices, boxes
+    
+    def position_uncertainty(self, indices: np.ndarray = None) -> float:
+        """Mean Kalman position std relative to box height (0 when there are no tracks)"""
+        covariance, mean = self.kf.covariance, self.kf.mean
+        if indices is not None:
+            covariance, mean = covariance[indices], mean[indices]
+        if len(mean) == 0:
+            return 0.0
+        std = np.sqrt(covariance[:, 0, 0] + covariance[:, 1, 1])
+        return float(np.mean(std / np.maximum(mean[:, 3], 1.0)))
+    
+    def propagate(self, track_indices: np.ndarray = None, measured_boxes: np.ndarray = None) -> List[Dict]:
+        """
+        Advance all tracks one frame without running the detector
+        
+        Tracks move by Kalman prediction, optionally corrected by externally
+        measured boxes (e.g. optical flow) for `track_indices`. Hits and ages
+        are left alone so skipped frames do not count as misses.
+        """
+        self.frame_count += 1
+        self.kf.predict()
+        if track_indices is not None and len(track_indices):
+            self.kf.update(track_indices, measured_boxes)
+        
+        for track, bbox in zip(self.tracks, self.kf.boxes().tolist()):
+            track.bbox = bbox
+            track.history.append(bbox)
+        
+        return [
+            {'track_id': t.track_id, 'bbox': t.bbox, 'detection_index': None}
+            for t in self._reported_tracks()
+        ]
     
-    def _calculate_iou(self, box1, box2):
-        x1 = max(box1[0], box2[0])
-        y1 = max(box1[1], box2[1])
-        x2 = min(box1[2], box2[2])
-        y2 = min(box1[3], box2[3])
-        
-        intersection = max(0, x2 - x1) * max(0, y2 - y1)
-        area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
-        area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
-        union = area1 + area2 - intersection
-        
-        return intersection / union if union > 0 else 0
-    
-    def update(self, detections: List[Dict]) -> List[Dict]:
-        """Simple tracking - assign IDs to detections"""
-        tracks = []
-        for i, detection in enumerate(detections):
-            tracks.append({
-                'track_id': self.next_id + i,
-                'bbox': detection['bbox']
-            })
-        self.next_id += len(detections)
-        return tracks
-    
-    def draw_tracks(self, frame: np.ndarray, tracks: List[Dict]) -> np.ndarray:
+    @staticmethod
+    def draw_tracks(frame: np.ndarray, tracks: List[Dict], inplace: bool = False) -> np.ndarray:
         """Draw tracking information on frame"""
-        annotated_frame = frame.copy()
+        annotated_frame = frame if inplace else frame.copy()
         
         colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255), 
                  (255, 255, 0), (255, 0, 255), (0, 255, 255)]
@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+from utils.picklable_lock import PicklableLock
+from utils.results_io import NUM_KEYPOINTS, _load
+
+# Column name -> (dtype, per-row shape), laid out like utils.results_io but
+# holding only model outputs. Crop poses keep the detection they belong to;
+# full-frame poses have detection index -1 and a NaN box.
+COLUMNS = {
+    'frame_numbers': (np.int32, ()),
+    'det_counts': (np.int32, ()),
+    'det_boxes': (np.float32, (4,)),
+    'det_scores': (np.float32, ()),
+    'pose_counts': (np.int32, ()),
+    'pose_keypoints': (np.float32, (NUM_KEYPOINTS, 2)),
+    'pose_scores': (np.float32, (NUM_KEYPOINTS,)),
+    'pose_detection_index': (np.int32, ()),
+    'pose_boxes': (np.float32, (4,)),
+}
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+class InferenceCache(PicklableLock):
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3, segment_frames: int = 256):
+        """
+        Content-addressed on-disk cache of per-frame detector and pose outputs
+        
+        Entries are keyed by the video's content hash and a model key (model
+        name, conf_threshold and any other setting that changes the
+        outputs); within an entry frames are looked up by frame number. Each
+        entry is a directory of segments stored as memory-mapped .npy
+        columns, so a re-run that only changes tracking or reporting reads
+        its detections back without loading a model.
+        
+        Args:
+            cache_dir: Directory holding the entries (shared between runs)
+            max_bytes: Size bound; least recently used entries are evicted
+                when a video is closed and the cache is over it
+            segment_frames: Frames buffered before a segment is written
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.segment_frames = segment_frames
+        os.makedirs(cache_dir, exist_ok=True)
+        self.stats = {'hits': 0, 'misses': 0, 'stored_frames': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+    
+    def __setstate__(self, state):
+        # A copy in another process counts only its own lookups
+        super().__setstate__(state)
+        self.stats = dict.fromkeys(self.stats, 0)
+    
+    def video_hash(self, video_path: str) -> str:
+        """
+        SHA-256 of the video file's contents
+        
+        Hashing a long video takes a while, so digests are remembered in
+        hashes.json per (path, size, mtime) and only recomputed when the file
+        changes.
+        """
+        path = os.path.abspath(video_path)
+        info = os.stat(path)
+        signature = f"{info.st_size}:{info.st_mtime_ns}"
+        index_path = os.path.join(self.cache_dir, 'hashes.json')
+        
+        with self._lock:
+            try:
+                with open(index_path) as f:
+                    known = json.load(f)
+            except (OSError, ValueError):
+                known = {}
+            if known.get(path, {}).get('signature') == signature:
+                return known[path]['sha256']
+            
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            known[path] = {'signature': signature, 'sha256': digest.hexdigest()}
+            _write_json(index_path, known)
+            return known[path]['sha256']
+    
+    def open(self, video_path: str, model_key: Dict) -> 'CachedVideo':
+        """Cache entry for one video and model configuration"""
+        video_hash = self.video_hash(video_path)
+        key = json.dumps({'video': video_hash, 'model': model_key}, sort_keys=True)
+        entry_dir = os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest()[:32])
+        os.makedirs(entry_dir, exist_ok=True)
+        _write_json(os.path.join(entry_dir, 'meta.json'),
+                    {'video': video_hash, 'video_path': os.path.abspath(video_path),
+                     'model': model_key, 'last_used': time.time()})
+        return CachedVideo(self, entry_dir)
+    
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+    
+    def entries(self) -> List[Tuple[str, float, int]]:
+        """(entry_dir, last_used, bytes) for every entry, least recently used first"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(entry_dir):
+                continue
+            try:
+                with open(os.path.join(entry_dir, 'meta.json')) as f:
+                    last_used = json.load(f)['last_used']
+            except (OSError, ValueError, KeyError):
+                last_used = 0.0
+            entries.append((entry_dir, last_used, _dir_size(entry_dir)))
+        return sorted(entries, key=lambda entry: entry[1])
+    
+    def evict(self, keep: str = None) -> int:
+        """Delete least recently used entries (never `keep`) until under max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, _, size in entries)
+        evicted = 0
+        for entry_dir, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            if entry_dir == keep:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            evicted += 1
+        self._count('evictions', evicted)
+        return evicted
+    
+    def summary(self) -> Dict:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return dict(self.stats, hit_rate=self.stats['hits'] / lookups if lookups else 0.0,
+                    size_bytes=sum(size for _, _, size in self.entries()),
+                    max_bytes=self.max_bytes)
+
+class CachedVideo:
+    def __init__(self, cache: InferenceCache, entry_dir: str):
+        """
+        Lookups and inserts for one cache entry (thread-safe)
+        
+        Segments present when the entry is opened are indexed by frame
+        number; new frames are buffered and written as new segments, each
+        under a unique name and renamed into place once complete, so
+        concurrent writers (e.g. parallel chunks) never see a partial one.
+        """
+        self.cache = cache
+        self.entry_dir = entry_dir
+        self.stats = {'hits': 0, 'misses': 0, 'stored_frames': 0}
+        self._lock = threading.Lock()
+        self._segments = []
+        self._index = {}
+        for name in sorted(os.listdir(entry_dir)):
+            if name.startswith('seg_'):
+                self._add_segment(os.path.join(entry_dir, name))
+        self._reset_buffers()
+    
+    def _add_segment(self, segment_dir):
+        columns = {name: _load(os.path.join(segment_dir, f"{name}.npy")) for name in COLUMNS}
+        offsets = {name: np.concatenate([[0], np.cumsum(columns[f"{name}_counts"])])
+                   for name in ('det', 'pose')}
+        segment = len(self._segments)
+        self._segments.append((columns, offsets))
+        for row, frame_number in enumerate(columns['frame_numbers'].tolist()):
+            self._index[frame_number] = (segment, row)
+    
+    def _reset_buffers(self):
+        self._buffers = {name: [] for name in COLUMNS}
+        self._buffered = {}
+    
+    def __len__(self):
+        return len(self._index)
+    
+    def __contains__(self, frame_number):
+        with self._lock:
+            return frame_number in self._index or frame_number in self._buffered
+    
+    def _count(self, name, n=1):
+        # Per-video counts here, totals over every video on the cache
+        with self._lock:
+            self.stats[name] += n
+        self.cache._count(name, n)
+    
+    def get(self, frame_number: int) -> Optional[Tuple[List[Dict], List[Dict]]]:
+        """(detections, poses) stored for this frame, or None on a miss"""
+        with self._lock:
+            location = self._index.get(frame_number)
+            buffered = self._buffered.get(frame_number)
+        if buffered is not None:
+            self._count('hits')
+            return buffered
+        if location is None:
+            self._count('misses')
+            return None
+        
+        segment, row = location
+        columns, offsets = self._segments[segment]
+        d0, d1 = offsets['det'][row], offsets['det'][row + 1]
+        p0, p1 = offsets['pose'][row], offsets['pose'][row + 1]
+        detections = [
+            {'bbox': bbox, 'confidence': score, 'class_name': 'person'}
+            for bbox, score in zip(columns['det_boxes'][d0:d1].tolist(),
+                                   columns['det_scores'][d0:d1].tolist())
+        ]
+        poses = []
+        for i in range(p0, p1):
+            pose = {'keypoints': np.array(columns['pose_keypoints'][i]),
+                    'scores': np.array(columns['pose_scores'][i])}
+            detection_index = int(columns['pose_detection_index'][i])
+            if detection_index >= 0:
+                pose['bbox'] = columns['pose_boxes'][i].tolist()
+                pose['detection_index'] = detection_index
+            poses.append(pose)
+        self._count('hits')
+        return detections, poses
+    
+    def put(self, frame_number: int, detections: List[Dict], poses: List[Dict]):
+        """Store one frame's model outputs; a segment is written every segment_frames frames"""
+        with self._lock:
+            if frame_number in self._index or frame_number in self._buffered:
+                return
+            buffers = self._buffers
+            buffers['frame_numbers'].append(frame_number)
+            buffers['det_counts'].append(len(detections))
+            buffers['det_boxes'].extend(d['bbox'] for d in detections)
+            buffers['det_scores'].extend(d['confidence'] for d in detections)
+            buffers['pose_counts'].append(len(poses))
+            for pose in poses:
+                buffers['pose_keypoints'].append(np.asarray(pose['keypoints'], dtype=np.float32))
+                buffers['pose_scores'].append(np.asarray(pose['scores'], dtype=np.float32))
+                buffers['pose_detection_index'].append(pose.get('detection_index', -1))
+                buffers['pose_boxes'].append(pose.get('bbox', [np.nan] * 4))
+            self._buffered[frame_number] = (detections, poses)
+            if len(self._buffered) >= self.cache.segment_frames:
+                self._flush()
+    
+    def _flush(self):
+        if not self._buffered:
+            return
+        frame_numbers = self._buffers['frame_numbers']
+        name = f"seg_{min(frame_numbers):08d}_{max(frame_numbers):08d}_{uuid.uuid4().hex[:8]}"
+        tmp_dir = os.path.join(self.entry_dir, f"tmp_{name}")
+        os.makedirs(tmp_dir)
+        for column, (dtype, row_shape) in COLUMNS.items():
+            values = self._buffers[column]
+            array = np.asarray(values, dtype=dtype).reshape((len(values),) + row_shape)
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), array)
+        segment_dir = os.path.join(self.entry_dir, name)
+        os.rename(tmp_dir, segment_dir)
+        
+        self.stats['stored_frames'] += len(self._buffered)
+        self.cache._count('stored_frames', len(self._buffered))
+        self._add_segment(segment_dir)
+        self._reset_buffers()
+    
+    def close(self):
+        """Write buffered frames and enforce the cache's size bound"""
+        with self._lock:
+            self._flush()
+        self.cache.evict(keep=self.entry_dir)
+    
+    def summary(self) -> Dict:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return dict(self.stats, hit_rate=self.stats['hits'] / lookups if lookups else 0.0,
+                    cached_frames=len(self._index))
@@ -0,0 +1,17 @@
+import threading
+
+class PicklableLock:
+    """
+    Mixin for objects guarded by `self._lock` that are also pickled (sent
+    to process-pool workers or saved in checkpoints): locks cannot be
+    pickled, so the lock is left out and a fresh one created on unpickle
+    """
+    
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,67 @@
+import os
+import cv2
+from typing import Iterable, Dict
+from keypoints.pose_estimator import draw_pose_skeletons
+from tracking.player_tracker import PlayerTracker
+from utils.video_io import ThreadedVideoReader, VideoSink
+
+def draw_frame_results(frame, frame_result: Dict):
+    """Draw one stored frame result (detections, poses, tracks) in place"""
+    for detection in frame_result['detections']:
+        x1, y1, x2, y2 = detection['bbox']
+        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+    
+    if frame_result['poses']:
+        draw_pose_skeletons(frame, frame_result['poses'])
+    
+    PlayerTracker.draw_tracks(frame, frame_result['tracks'], inplace=True)
+    
+    info_text = [f"Frame: {frame_result['frame_number']}",
+                 f"Players: {len(frame_result['tracks'])}"]
+    for i, text in enumerate(info_text):
+        cv2.putText(frame, text, (10, 30 + i * 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    return frame
+
+def render_results(video_path: str, results: Iterable[Dict], output_path: str,
+                   encoder: str = 'opencv') -> int:
+    """
+    Render an annotated video offline from stored per-frame results
+    
+    `results` is process_video's frame_results list or a ResultsReader.
+    No model is loaded: everything is drawn from the stored boxes, keypoints
+    and track IDs. Returns the number of frames written.
+    """
+    reader = ThreadedVideoReader(video_path)
+    if not reader.isOpened():
+        print(f"❌ Error: Could not open video file {video_path}")
+        return 0
+    
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    out = VideoSink(output_path, reader.fps, (reader.width, reader.height),
+                    encoder=encoder, threaded=True)
+    
+    frame_number = 0
+    written = 0
+    try:
+        for frame_result in results:
+            # Frame numbers are 1-based; skip source frames without results
+            frame = None
+            while frame_number < frame_result['frame_number']:
+                frame, release = reader.read()
+                if frame is None:
+                    break
+                frame_number += 1
+                if frame_number < frame_result['frame_number']:
+                    release()
+            if frame is None:
+                break
+            
+            out.write(draw_frame_results(frame, frame_result), release)
+            written += 1
+    finally:
+        out.release()
+        reader.release()
+    
+    print(f"✓ Rendered {written} frames to {output_path}")
+    return written
@@ -0,0 +1,209 @@
+import json
+import os
+import shutil
+import numpy as np
+from typing import List, Dict, Iterator
+from utils.stats import RunningStats, StreamingHistogram
+
+NUM_KEYPOINTS = 33
+
+# Column name -> (dtype, per-row shape). Each chunk stores one .npy file per
+# column; *_counts columns hold how many rows each frame owns in the
+# detection / track / pose columns that follow them. keyframes marks the
+# frames the detector ran on (all of them unless detect_stride > 1).
+COLUMNS = {
+    'frame_numbers': (np.int32, ()),
+    'keyframes': (np.bool_, ()),
+    'det_counts': (np.int32, ()),
+    'det_boxes': (np.float32, (4,)),
+    'det_scores': (np.float32, ()),
+    'track_counts': (np.int32, ()),
+    'track_ids': (np.int32, ()),
+    'track_boxes': (np.float32, (4,)),
+    'pose_counts': (np.int32, ()),
+    'pose_keypoints': (np.float32, (NUM_KEYPOINTS, 2)),
+    'pose_scores': (np.float32, (NUM_KEYPOINTS,)),
+    'pose_track_ids': (np.int32, ()),
+}
+
+def _load(path):
+    # Empty files cannot be memory-mapped
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        return np.load(path)
+
+class ResultsWriter:
+    def __init__(self, output_dir: str, chunk_size: int = 256, resume: Dict = None):
+        """
+        Append per-frame results to disk as columnar NumPy chunks
+        
+        Args:
+            output_dir: Directory receiving chunk_XXXXX/ folders and meta.json
+            chunk_size: Frames buffered in memory before a chunk is flushed
+            resume: A state() taken right after a flush; appending continues
+                from there and chunks written after it are discarded
+        """
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self.num_frames = resume['num_frames'] if resume else 0
+        self.num_chunks = resume['num_chunks'] if resume else 0
+        os.makedirs(output_dir, exist_ok=True)
+        if resume:
+            for name in os.listdir(output_dir):
+                if name.startswith('chunk_') and int(name[len('chunk_'):]) >= self.num_chunks:
+                    shutil.rmtree(os.path.join(output_dir, name))
+        self._reset_buffers()
+    
+    def state(self) -> Dict:
+        """Resume point for a new writer (call flush() first so nothing is buffered)"""
+        return {'num_frames': self.num_frames - self._buffered_frames, 'num_chunks': self.num_chunks}
+    
+    def _reset_buffers(self):
+        self._buffers = {name: [] for name in COLUMNS}
+        self._buffered_frames = 0
+    
+    def append(self, frame_number: int, detections: List[Dict], poses: List[Dict], tracks: List[Dict],
+               keyframe: bool = True):
+        """Buffer one frame; flushes a chunk every chunk_size frames"""
+        buffers = self._buffers
+        buffers['frame_numbers'].append(frame_number)
+        buffers['keyframes'].append(keyframe)
+        
+        buffers['det_counts'].append(len(detections))
+        buffers['det_boxes'].extend(d['bbox'] for d in detections)
+        buffers['det_scores'].extend(d['confidence'] for d in detections)
+        
+        buffers['track_counts'].append(len(tracks))
+        buffers['track_ids'].extend(t['track_id'] for t in tracks)
+        buffers['track_boxes'].extend(t['bbox'] for t in tracks)
+        
+        buffers['pose_counts'].append(len(poses))
+        for pose in poses:
+            buffers['pose_keypoints'].append(np.asarray(pose['keypoints'], dtype=np.float32))
+            buffers['pose_scores'].append(np.asarray(pose['scores'], dtype=np.float32))
+            track_id = pose.get('track_id')
+            buffers['pose_track_ids'].append(-1 if track_id is None else track_id)
+        
+        self._buffered_frames += 1
+        self.num_frames += 1
+        if self._buffered_frames >= self.chunk_size:
+            self.flush()
+    
+    def flush(self):
+        """Write buffered frames as a new chunk"""
+        if self._buffered_frames == 0:
+            return
+        
+        chunk_dir = os.path.join(self.output_dir, f"chunk_{self.num_chunks:05d}")
+        os.makedirs(chunk_dir, exist_ok=True)
+        for name, (dtype, row_shape) in COLUMNS.items():
+            values = self._buffers[name]
+            array = np.asarray(values, dtype=dtype).reshape((len(values),) + row_shape)
+            np.save(os.path.join(chunk_dir, f"{name}.npy"), array)
+        
+        self.num_chunks += 1
+        self._reset_buffers()
+    
+    def close(self):
+        self.flush()
+        with open(os.path.join(self.output_dir, 'meta.json'), 'w') as f:
+            json.dump({'num_frames': self.num_frames, 'num_chunks': self.num_chunks,
+                       'chunk_size': self.chunk_size}, f, indent=2)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+class ResultsReader:
+    def __init__(self, results_dir: str):
+        """Memory-mapped access to results written by ResultsWriter"""
+        self.results_dir = results_dir
+        with open(os.path.join(results_dir, 'meta.json')) as f:
+            self.meta = json.load(f)
+    
+    def __len__(self):
+        return self.meta['num_frames']
+    
+    def chunks(self) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield each chunk as a dict of memory-mapped column arrays"""
+        for i in range(self.meta['num_chunks']):
+            chunk_dir = os.path.join(self.results_dir, f"chunk_{i:05d}")
+            yield {name: _load(os.path.join(chunk_dir, f"{name}.npy")) for name in COLUMNS}
+    
+    def __iter__(self) -> Iterator[Dict]:
+        """Yield frames in the same dict layout as process_video's frame_results"""
+        for chunk in self.chunks():
+            det_offsets = np.concatenate([[0], np.cumsum(chunk['det_counts'])])
+            track_offsets = np.concatenate([[0], np.cumsum(chunk['track_counts'])])
+            pose_offsets = np.concatenate([[0], np.cumsum(chunk['pose_counts'])])
+            
+            for i, frame_number in enumerate(chunk['frame_numbers']):
+                d0, d1 = det_offsets[i], det_offsets[i + 1]
+                t0, t1 = track_offsets[i], track_offsets[i + 1]
+                p0, p1 = pose_offsets[i], pose_offsets[i + 1]
+                yield {
+                    'frame_number': int(frame_number),
+                    'keyframe': bool(chunk['keyframes'][i]),
+                    'detections': [
+                        {'bbox': bbox, 'confidence': score, 'class_name': 'person'}
+                        for bbox, score in zip(chunk['det_boxes'][d0:d1].tolist(),
+                                               chunk['det_scores'][d0:d1].tolist())
+                    ],
+                    'poses': [
+                        {'keypoints': keypoints, 'scores': scores,
+                         'track_id': None if track_id < 0 else track_id}
+                        for keypoints, scores, track_id in zip(chunk['pose_keypoints'][p0:p1].tolist(),
+                                                               chunk['pose_scores'][p0:p1].tolist(),
+                                                               chunk['pose_track_ids'][p0:p1].tolist())
+                    ],
+                    'tracks': [
+                        {'track_id': track_id, 'bbox': bbox}
+                        for track_id, bbox in zip(chunk['track_ids'][t0:t1].tolist(),
+                                                  chunk['track_boxes'][t0:t1].tolist())
+                    ]
+                }
+    
+    def summary(self) -> Dict:
+        """
+        Report aggregates computed chunk by chunk from the memory-mapped
+        columns, with the same keys and numbers as ResultsAccumulator.summary()
+        """
+        confidence = RunningStats()
+        confidence_histogram = StreamingHistogram(0.0, 1.0, bins=20)
+        track_ids = set()
+        keyframes = []
+        frame_confidences = []
+        detections_per_frame = []
+        
+        for chunk in self.chunks():
+            counts = np.asarray(chunk['det_counts'])
+            scores = np.asarray(chunk['det_scores'], dtype=np.float64)
+            
+            # Only keyframes have detections, so every score is a keyframe's
+            confidence.update_batch(scores)
+            confidence_histogram.update(scores)
+            track_ids.update(np.unique(chunk['track_ids']).tolist())
+            keyframes.append(np.asarray(chunk['keyframes'], dtype=bool))
+            
+            # Per-frame mean confidence without a Python loop over frames
+            frame_of_detection = np.repeat(np.arange(len(counts)), counts)
+            sums = np.bincount(frame_of_detection, weights=scores, minlength=len(counts))
+            frame_confidences.append(np.divide(sums, counts, out=np.zeros(len(counts)), where=counts > 0))
+            detections_per_frame.append(counts)
+        
+        keyframes = np.concatenate(keyframes) if keyframes else np.zeros(0, dtype=bool)
+        return {
+            'frame_count': len(self),
+            'keyframe_count': int(keyframes.sum()),
+            'total_detections': confidence.count,
+            'total_tracks': len(track_ids),
+            'average_confidence': float(confidence.mean),
+            'confidence_std': float(confidence.std),
+            'confidence_histogram': confidence_histogram.as_dict(),
+            'keyframes': keyframes,
+            'frame_confidences': np.concatenate(frame_confidences) if frame_confidences else np.zeros(0),
+            'detections_per_frame': np.concatenate(detections_per_frame) if detections_per_frame else np.zeros(0)
+        }
@@ -0,0 +1,172 @@
+import math
+import numpy as np
+from array import array
+from collections import deque
+from typing import List, Dict
+
+class RunningStats:
+    """Online count/mean/variance/min/max (Welford, with Chan's batch merge)"""
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self._m2 = 0.0
+    
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+    
+    def update_batch(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        
+        total_count = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total_count
+        self._m2 += batch_m2 + delta ** 2 * self.count * n / total_count
+        self.count = total_count
+        self.total += values.sum()
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+    
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def std(self):
+        return self.variance ** 0.5
+    
+    def as_dict(self) -> Dict:
+        empty = self.count == 0
+        return {'count': self.count, 'mean': float(self.mean), 'std': float(self.std),
+                'min': 0.0 if empty else float(self.min), 'max': 0.0 if empty else float(self.max)}
+
+class RollingWindow:
+    """Mean over the last `size` values with O(1) updates"""
+    
+    def __init__(self, size: int = 10):
+        self.values = deque(maxlen=size)
+        self._sum = 0.0
+    
+    def update(self, value: float):
+        if len(self.values) == self.values.maxlen:
+            self._sum -= self.values[0]
+        self.values.append(value)
+        self._sum += value
+    
+    @property
+    def mean(self):
+        return self._sum / len(self.values) if self.values else 0.0
+
+class StreamingHistogram:
+    """Fixed-bin histogram; values outside [low, high] land in the edge bins"""
+    
+    def __init__(self, low: float, high: float, bins: int = 20):
+        self.edges = np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self._low = float(low)
+        self._scale = bins / (high - low)
+    
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        indices = np.clip(np.searchsorted(self.edges, values, side='right') - 1, 0, len(self.counts) - 1)
+        self.counts += np.bincount(indices, minlength=len(self.counts))
+    
+    def add(self, value: float):
+        """Single-value update in plain Python (no per-call array overhead)"""
+        index = min(max(int(math.floor((value - self._low) * self._scale)), 0), len(self.counts) - 1)
+        self.counts[index] += 1
+    
+    def quantile(self, q: float) -> float:
+        """Approximate quantile from bin counts (linear within a bin)"""
+        total = self.counts.sum()
+        if total == 0:
+            return 0.0
+        cumulative = np.cumsum(self.counts)
+        target = q * total
+        i = int(np.searchsorted(cumulative, target))
+        before = cumulative[i - 1] if i > 0 else 0
+        fraction = (target - before) / self.counts[i] if self.counts[i] else 0.0
+        return float(self.edges[i] + fraction * (self.edges[i + 1] - self.edges[i]))
+    
+    def as_dict(self) -> Dict:
+        return {'edges': self.edges.tolist(), 'counts': self.counts.tolist()}
+
+class MetricStream:
+    """Running stats plus a short rolling window for one per-frame metric"""
+    
+    def __init__(self, window: int = 10):
+        self.stats = RunningStats()
+        self.recent = RollingWindow(window)
+    
+    def update(self, value: float):
+        self.stats.update(value)
+        self.recent.update(value)
+
+class ResultsAccumulator:
+    """
+    Report aggregates updated once per frame
+    
+    Replaces rescanning frame_results after a run: summary() is produced
+    from running totals. The per-frame series used for plotting are kept
+    as compact typed arrays. Detection totals and confidence stats cover
+    detector keyframes only (frames between them, with detect_stride > 1,
+    have no detections of their own), so they match a summary of the
+    stored results; per-keyframe averages use keyframe_count.
+    """
+    
+    def __init__(self):
+        self.frame_count = 0
+        self.keyframe_count = 0
+        self.confidence = RunningStats()
+        self.confidence_histogram = StreamingHistogram(0.0, 1.0, bins=20)
+        self.track_ids = set()
+        self.keyframes = array('b')
+        self.frame_confidences = array('f')
+        self.detections_per_frame = array('i')
+    
+    def update(self, detections: List[Dict], tracks: List[Dict], keyframe: bool = True):
+        self.frame_count += 1
+        self.track_ids.update(t['track_id'] for t in tracks)
+        self.keyframes.append(keyframe)
+        if not keyframe:
+            self.frame_confidences.append(0.0)
+            self.detections_per_frame.append(0)
+            return
+        confidences = np.fromiter((d['confidence'] for d in detections),
+                                  dtype=np.float64, count=len(detections))
+        self.keyframe_count += 1
+        self.confidence.update_batch(confidences)
+        self.confidence_histogram.update(confidences)
+        self.frame_confidences.append(confidences.mean() if len(confidences) else 0.0)
+        self.detections_per_frame.append(len(confidences))
+    
+    def summary(self) -> Dict:
+        return {
+            'frame_count': self.frame_count,
+            'keyframe_count': self.keyframe_count,
+            'total_detections': self.confidence.count,
+            'total_tracks': len(self.track_ids),
+            'average_confidence': float(self.confidence.mean),
+            'confidence_std': float(self.confidence.std),
+            'confidence_histogram': self.confidence_histogram.as_dict(),
+            # Copies: a live buffer export would block further appends
+            'keyframes': np.frombuffer(self.keyframes, dtype=np.int8).astype(bool),
+            'frame_confidences': np.frombuffer(self.frame_confidences, dtype=np.float32).copy(),
+            'detections_per_frame': np.frombuffer(self.detections_per_frame, dtype=np.int32).copy()
+        }
@@ -0,0 +1,269 @@
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import cv2
+import numpy as np
+from typing import Callable, Optional, Tuple
+from utils.profiler import Profiler
+
+def _noop():
+    pass
+
+class FrameRing:
+    """Fixed pool of preallocated frame buffers, handed out and returned by slot index"""
+    
+    def __init__(self, size: int, shape: Tuple[int, int, int]):
+        self.buffers = [np.empty(shape, dtype=np.uint8) for _ in range(size)]
+        self._free = queue.Queue()
+        for slot in range(size):
+            self._free.put(slot)
+    
+    def acquire(self) -> int:
+        return self._free.get()
+    
+    def release(self, slot: int):
+        self._free.put(slot)
+
+class VideoSource:
+    """Plain cv2.VideoCapture reader with the same interface as ThreadedVideoReader"""
+    
+    def __init__(self, video_path: str, profiler: Profiler = None, start_frame: int = 0):
+        self.profiler = profiler or Profiler(enabled=False)
+        self.cap = cv2.VideoCapture(video_path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        # Container frame count; may be approximate for some codecs
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if start_frame:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+    
+    def read(self) -> Tuple[Optional[np.ndarray], Callable]:
+        """Next frame and a callback to hand its buffer back, or (None, None) at the end"""
+        with self.profiler.span('decode'):
+            ret, frame = self.cap.read()
+        return (frame, _noop) if ret else (None, None)
+    
+    def release(self):
+        self.cap.release()
+
+class ThreadedVideoReader(VideoSource):
+    def __init__(self, video_path: str, ring_size: int = 8, profiler: Profiler = None,
+                 start_frame: int = 0):
+        """
+        Decodes on a background thread straight into a ring of preallocated buffers
+        
+        Frames returned by read() stay valid until their release callback is
+        called, after which the buffer is reused for a later frame. At most
+        `ring_size` frames are decoded ahead of or held by the consumer.
+        """
+        super().__init__(video_path, profiler, start_frame)
+        self.ring = FrameRing(ring_size, (self.height, self.width, 3))
+        self._ready = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        if self.isOpened():
+            self._thread = threading.Thread(target=self._decode, daemon=True)
+            self._thread.start()
+    
+    def _decode(self):
+        try:
+            while not self._stop.is_set():
+                slot = self.ring.acquire()
+                if self._stop.is_set():
+                    break
+                buffer = self.ring.buffers[slot]
+                with self.profiler.span('decode'):
+                    ret, frame = self.cap.read(image=buffer)
+                if not ret:
+                    self.ring.release(slot)
+                    break
+                if frame is not buffer:
+                    # Decoder produced a different layout; keep the ring contract
+                    np.copyto(buffer, frame)
+                self._ready.put(slot)
+        finally:
+            self._ready.put(None)
+    
+    def read(self) -> Tuple[Optional[np.ndarray], Callable]:
+        if self._thread is None:
+            return None, None
+        slot = self._ready.get()
+        if slot is None:
+            self._ready.put(None)  # stay at end-of-stream for further reads
+            return None, None
+        return self.ring.buffers[slot], lambda: self.ring.release(slot)
+    
+    def release(self):
+        self._stop.set()
+        if self._thread is not None:
+            # Wake a decoder waiting for a free buffer
+            self.ring.release(0)
+            self._thread.join()
+        self.cap.release()
+
+class LiveVideoReader(VideoSource):
+    def __init__(self, source: str, realtime: bool = None, profiler: Profiler = None):
+        """
+        Captures on a background thread and keeps only the newest frame
+        
+        A consumer that falls behind gets the latest frame on its next
+        read_latest(); the frames it never saw are counted in `dropped`.
+        
+        Args:
+            source: Camera index ('0'), RTSP/HTTP URL, named pipe or file
+            realtime: Pace reads at the stream's frame rate, so a file
+                behaves like a live feed (default: only for files)
+            profiler: Records decode spans
+        """
+        source = str(source)
+        super().__init__(int(source) if source.isdigit() else source, profiler)
+        self.realtime = os.path.isfile(source) if realtime is None else realtime
+        self.captured = 0
+        self.dropped = 0
+        self._latest = None
+        self._ended = False
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        if self.isOpened():
+            self._thread = threading.Thread(target=self._capture, daemon=True)
+            self._thread.start()
+    
+    def _capture(self):
+        interval = 1.0 / self.fps if self.realtime and self.fps > 0 else 0.0
+        start_time = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                if interval:
+                    delay = start_time + self.captured * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                with self.profiler.span('decode'):
+                    ret, frame = self.cap.read()
+                if not ret:
+                    break
+                capture_time = time.perf_counter()
+                with self._condition:
+                    if self._latest is not None:
+                        self.dropped += 1
+                    self.captured += 1
+                    self._latest = (self.captured, frame, capture_time)
+                    self._condition.notify()
+        finally:
+            with self._condition:
+                self._ended = True
+                self._condition.notify_all()
+    
+    def read_latest(self) -> Optional[Tuple[int, np.ndarray, float]]:
+        """
+        Newest unread frame as (frame_number, frame, capture perf_counter
+        time), waiting for one if needed; None once the stream has ended
+        """
+        with self._condition:
+            while self._latest is None and not self._ended:
+                self._condition.wait()
+            latest, self._latest = self._latest, None
+            return latest
+    
+    def read(self) -> Tuple[Optional[np.ndarray], Callable]:
+        latest = self.read_latest()
+        return (latest[1], _noop) if latest is not None else (None, None)
+    
+    def release(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.cap.release()
+
+class FfmpegWriter:
+    """Pipes raw BGR frames to an ffmpeg subprocess for H.264 encoding"""
+    
+    def __init__(self, output_path: str, fps: float, size: Tuple[int, int], preset: str = 'veryfast'):
+        if shutil.which('ffmpeg') is None:
+            raise RuntimeError("ffmpeg not found on PATH (needed for encoder='ffmpeg')")
+        width, height = size
+        self.process = subprocess.Popen([
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps or 30),
+            '-i', '-',
+            '-c:v', 'libx264', '-preset', preset, '-pix_fmt', 'yuv420p', output_path
+        ], stdin=subprocess.PIPE)
+    
+    def write(self, frame: np.ndarray):
+        # The contiguous buffer is handed to the pipe without an extra copy
+        self.process.stdin.write(np.ascontiguousarray(frame).data)
+    
+    def release(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+class VideoSink:
+    def __init__(self, output_path: str, fps: float, size: Tuple[int, int],
+                 encoder: str = 'opencv', threaded: bool = False, queue_size: int = 8,
+                 profiler: Profiler = None):
+        """
+        Video writer with optional background encoding
+        
+        Args:
+            encoder: 'opencv' (mp4v via cv2.VideoWriter) or 'ffmpeg' (H.264 pipe)
+            threaded: Encode on a background thread; each frame's release
+                callback runs once it has been written
+            queue_size: Max frames waiting for the encoder thread
+            profiler: Records an 'encode' span per written frame (on the
+                encoder thread when threaded)
+        """
+        self.profiler = profiler or Profiler(enabled=False)
+        if encoder == 'ffmpeg':
+            self.writer = FfmpegWriter(output_path, fps, size)
+        elif encoder == 'opencv':
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            self.writer = cv2.VideoWriter(output_path, fourcc, fps, size)
+        else:
+            raise ValueError(f"Unknown encoder: {encoder}")
+        
+        self._queue = None
+        self._errors = []
+        if threaded:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._encode, daemon=True)
+            self._thread.start()
+    
+    def _encode(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, release = item
+            try:
+                if not self._errors:
+                    with self.profiler.span('encode'):
+                        self.writer.write(frame)
+            except Exception as e:
+                self._errors.append(e)
+            finally:
+                release()
+    
+    def write(self, frame: np.ndarray, release: Callable = _noop):
+        if self._errors:
+            raise self._errors[0]
+        if self._queue is None:
+            with self.profiler.span('encode'):
+                self.writer.write(frame)
+            release()
+        else:
+            self._queue.put((frame, release))
+    
+    def release(self):
+        if self._queue is not None:
+            self._queue.put(None)
+            self._thread.join()
+        self.writer.release()
+        if self._errors:
+            raise self._errors[0]